@@ -1,13 +1,49 @@
 import numpy as np
+from bisect import bisect_left
 from datetime import datetime, timedelta
+import os
+import pickle
 import re
-import matplotlib.pyplot as plt
-from math import sin, cos, asin, atan2, sqrt, radians, degrees
+from math import sqrt
+
+
+def _plt():
+    """Ленивая загрузка matplotlib
+
+    Импорт matplotlib тянет десятки модулей и кеш шрифтов; числовой
+    путь (парсинг и расчет задержек) не должен платить за него.
+    """
+    import matplotlib.pyplot as plt
+
+    return plt
+
+
+# Метка IONEX занимает колонки 61-80, значения — первые 60 колонок.
+# Компилируем один раз на модуль, чтобы не сканировать каждую строку
+# заново для каждой проверяемой метки.
+_IONEX_LABEL_RE = re.compile(r"^(.{60})(.{1,20})")
+
+
+def _ionex_label(line):
+    """Возвращает (значение, метка) строки IONEX или (строка, '')"""
+    m = _IONEX_LABEL_RE.match(line)
+    if m:
+        return m.group(1), m.group(2).strip()
+    return line, ""
+
+
+# Подробный отладочный вывод парсеров (построчный дамп записей ГЛОНАСС
+# и детальная статистика) включается переменной окружения IONEX_VERBOSE:
+#   IONEX_VERBOSE=1 python main.py
+# По умолчанию выключен — диагностика нужна только людям при отладке.
+_VERBOSE = bool(os.environ.get("IONEX_VERBOSE"))
 
 
 # Функция для визуализации
 def plot_tec_map(tec_map, header, epoch=None):
     """Визуализация карты TEC"""
+    plt = _plt()
+
     lat_range = header["lat_range"]
     lon_range = header["lon_range"]
 
@@ -29,33 +65,53 @@ def plot_tec_map(tec_map, header, epoch=None):
 
 
 def parse_ionex_simple(filepath):
-    """Упрощенный парсер для файлов IONEX"""
+    """Упрощенный парсер для файлов IONEX
+
+    Результат разбора кешируется в сайдкар <filepath>.parsed.pkl с
+    ключом (mtime, размер): пока исходник не менялся, повторный запуск
+    читает готовые массивы одним блоком вместо построчного разбора.
+    """
+    cache_file = filepath + ".parsed.pkl"
+    cache_key = (os.path.getmtime(filepath), os.path.getsize(filepath))
+
+    if os.path.exists(cache_file):
+        try:
+            with open(cache_file, "rb") as f:
+                cached = pickle.load(f)
+            if cached.get("key") == cache_key:
+                return cached["maps"], cached["header"]
+        except Exception:
+            pass  # поврежденный кеш — просто разбираем исходник заново
+
     with open(filepath, "r") as f:
         content = f.read()
 
     # Разделяем на строки
     lines = content.split("\n")
 
-    # Парсим заголовок
+    # Парсим заголовок: метку извлекаем один раз и сравниваем по ней,
+    # вместо повторных поисков подстроки для каждого параметра
     header = {}
     for i, line in enumerate(lines):
-        if "END OF HEADER" in line:
+        value, label = _ionex_label(line)
+
+        if label == "END OF HEADER":
             data_start = i + 1
             break
 
         # Парсим ключевые параметры
-        if "LAT1 / LAT2 / DLAT" in line:
-            lat1, lat2, dlat = map(float, line.split()[:3])
+        if label == "LAT1 / LAT2 / DLAT":
+            lat1, lat2, dlat = map(float, value.split()[:3])
             header["lat_range"] = (lat1, lat2, dlat)
             n_lat = int((lat2 - lat1) / dlat) + 1
 
-        elif "LON1 / LON2 / DLON" in line:
-            lon1, lon2, dlon = map(float, line.split()[:3])
+        elif label == "LON1 / LON2 / DLON":
+            lon1, lon2, dlon = map(float, value.split()[:3])
             header["lon_range"] = (lon1, lon2, dlon)
             n_lon = int((lon2 - lon1) / dlon) + 1
 
-        elif "# OF MAPS IN FILE" in line:
-            n_maps = int(line.split()[0])
+        elif label == "# OF MAPS IN FILE":
+            n_maps = int(value.split()[0])
             header["n_maps"] = n_maps
 
     # Парсим данные
@@ -63,7 +119,7 @@ def parse_ionex_simple(filepath):
     i = data_start
 
     while i < len(lines):
-        if "START OF TEC MAP" not in lines[i]:
+        if _ionex_label(lines[i])[1] != "START OF TEC MAP":
             i += 1
             continue
 
@@ -74,8 +130,9 @@ def parse_ionex_simple(filepath):
         epoch = datetime(*epoch_data)
         i += 1
 
-        # Создаем массив для карты
-        tec_map = np.zeros((n_lat, n_lon))
+        # Создаем массив для карты: float32 достаточно для точности
+        # ~0.1 TECU и вдвое сокращает трафик памяти при интерполяции
+        tec_map = np.zeros((n_lat, n_lon), dtype=np.float32)
         lat_idx = 0
 
         while lat_idx < n_lat and i < len(lines):
@@ -141,9 +198,19 @@ def parse_ionex_simple(filepath):
         maps.append({"epoch": epoch, "tec": tec_map})
 
         # Пропускаем END OF TEC MAP если есть
-        if i < len(lines) and "END OF TEC MAP" in lines[i]:
+        if i < len(lines) and _ionex_label(lines[i])[1] == "END OF TEC MAP":
             i += 1
 
+    try:
+        with open(cache_file, "wb") as f:
+            pickle.dump(
+                {"key": cache_key, "maps": maps, "header": header},
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+    except Exception:
+        pass  # кеш — только ускорение, его отсутствие не ошибка
+
     return maps, header
 
 
@@ -152,14 +219,15 @@ def parse_glonass_nav(filepath):
     satellites = {}
 
     with open(filepath, "r") as f:
-        lines = f.readlines()
+        # Пропускаем заголовок, не материализуя его строки в список:
+        # читаем по одной до END OF HEADER, в память попадают только данные
+        for line in f:
+            if "END OF HEADER" in line:
+                break
 
-    i = 0
-    # Пропускаем заголовок
-    while i < len(lines) and "END OF HEADER" not in lines[i]:
-        i += 1
+        lines = f.readlines()
 
-    i += 1  # Переходим к данным после заголовка
+    i = 0  # Начало данных после заголовка
 
     def parse_float(value_str):
         """Парсит числа в формате D или обычные float"""
@@ -225,8 +293,6 @@ def parse_glonass_nav(filepath):
 
         # Если split дал мало частей, значит числа слитные
         # Ищем паттерны чисел в научной нотации
-        import re
-
         # Паттерн для чисел в формате D: [+-]?\d+\.?\d*D[+-]\d+
         pattern = r"[+-]?\d+\.?\d*D[+-]\d+"
         matches = re.findall(pattern, line)
@@ -265,16 +331,12 @@ def parse_glonass_nav(filepath):
         # Формат: PRN год месяц день час минута секунда tau_n gamma_n t_k
         if len(parts) >= 10 and parts[0].isdigit():
             try:
-                # Извлекаем базовую информацию
+                # Извлекаем базовую информацию: все поля эпохи, кроме секунд,
+                # целые — одного map(int, ...) достаточно
                 prn = int(parts[0])
-                year = (
-                    2000 + int(parts[1]) if int(parts[1]) < 80 else 1900 + int(parts[1])
-                )
-                month = int(parts[2])
-                day = int(parts[3])
-                hour = int(parts[4])
-                minute = int(parts[5])
-                second = float(parts[6])
+                year, month, day, hour, minute = map(int, parts[1:6])
+                year = 2000 + year if year < 80 else 1900 + year
+                second = int(float(parts[6]))
 
                 # Проверяем, что следующие 3 строки существуют
                 if i + 3 >= len(lines):
@@ -291,7 +353,7 @@ def parse_glonass_nav(filepath):
                 line4_parts = parse_data_line(line4)
 
                 # Отладочный вывод первых нескольких записей
-                if i < 20:  # Только для первых записей
+                if _VERBOSE and i < 20:  # Только для первых записей
                     print(f"\nПарсинг спутника R{prn:02d} на строке {i+1}:")
                     print(f"  Строка 1: {line}")
                     print(f"  Строка 2: {line2} -> части: {line2_parts}")
@@ -371,7 +433,7 @@ def parse_glonass_nav(filepath):
 
                 # Создаем объект с данными спутника
                 sat_data = {
-                    "epoch": datetime(year, month, day, hour, minute, int(second)),
+                    "epoch": datetime(year, month, day, hour, minute, second),
                     "X": X,
                     "Y": Y,
                     "Z": Z,
@@ -418,19 +480,20 @@ def parse_glonass_nav(filepath):
     if satellites:
         print(f"Доступные спутники: {sorted(list(satellites.keys()))}")
 
-        # Статистика по первым 5 спутникам
-        print(f"\nДетальная информация (первые 5 спутников):")
-        for prn in sorted(list(satellites.keys()))[:5]:
-            data = satellites[prn]
-            if data:
-                print(f"  Спутник R{prn:02d}:")
-                print(f"    Количество записей: {len(data)}")
-                print(
-                    f"    Временной диапазон: {data[0]['epoch'].strftime('%H:%M:%S')} - {data[-1]['epoch'].strftime('%H:%M:%S')}"
-                )
-                print(
-                    f"    Первая позиция: {data[0]['lat']:.2f}°N, {data[0]['lon']:.2f}°E, высота: {data[0]['height']:.0f} км"
-                )
+        # Статистика по первым 5 спутникам — только в режиме отладки
+        if _VERBOSE:
+            print(f"\nДетальная информация (первые 5 спутников):")
+            for prn in sorted(list(satellites.keys()))[:5]:
+                data = satellites[prn]
+                if data:
+                    print(f"  Спутник R{prn:02d}:")
+                    print(f"    Количество записей: {len(data)}")
+                    print(
+                        f"    Временной диапазон: {data[0]['epoch'].strftime('%H:%M:%S')} - {data[-1]['epoch'].strftime('%H:%M:%S')}"
+                    )
+                    print(
+                        f"    Первая позиция: {data[0]['lat']:.2f}°N, {data[0]['lon']:.2f}°E, высота: {data[0]['height']:.0f} км"
+                    )
     else:
         print("ВНИМАНИЕ: Не удалось прочитать данные спутников!")
         print("Возможные причины:")
@@ -480,6 +543,8 @@ def plot_tec_map_with_satellites(
     tec_map, header, epoch, satellites_data, selected_prns=[1, 2, 3]
 ):
     """Визуализация карты TEC с траекториями спутников (только 2D карта)"""
+    plt = _plt()
+
     lat_range = header["lat_range"]
     lon_range = header["lon_range"]
 
@@ -578,19 +643,19 @@ def plot_tec_map_with_satellites(
 
                 # Добавляем маркеры вдоль траектории
                 if len(ground_track) > 10:
-                    # Берем каждую 10-ю точку для маркеров
+                    # Берем каждую 10-ю точку и рисуем все маркеры одним
+                    # вызовом scatter — один артист вместо вызова на точку
                     step = len(ground_track) // 10
-                    for j in range(0, len(ground_track), step):
-                        lon_m, lat_m = ground_track[j]
-                        ax.scatter(
-                            lon_m,
-                            lat_m,
-                            color=colors[idx % len(colors)],
-                            marker=markers[idx % len(markers)],
-                            s=40,
-                            alpha=0.6,
-                            zorder=4,
-                        )
+                    marker_lons, marker_lats = zip(*ground_track[::step])
+                    ax.scatter(
+                        marker_lons,
+                        marker_lats,
+                        color=colors[idx % len(colors)],
+                        marker=markers[idx % len(markers)],
+                        s=40,
+                        alpha=0.6,
+                        zorder=4,
+                    )
 
     # Настройки осей
     ax.set_xlabel("Долгота (°)", fontsize=12)
@@ -662,13 +727,43 @@ def plot_tec_map_with_satellites(
     print("=" * 70)
 
 
+# Частота сигнала ГЛОНАСС L1, Гц
+GLONASS_L1_FREQ = 1602e6
+
+# Коэффициент ионосферной рефракции 40.31 м³/с², сразу умноженный на
+# 10^16 эл/м² (1 TECU) — константа свернута один раз при импорте
+K_TECU = 40.31e16
+
+# Однослойная модель ионосферы: высота слоя и радиус Земли в км
+IONO_SHELL_HEIGHT_KM = 450.0
+EARTH_RADIUS_KM = 6371.0
+
+# Геометрический множитель R/(R+h) функции отображения — константа
+# модели, считается один раз при импорте
+_MAPPING_K = EARTH_RADIUS_KM / (EARTH_RADIUS_KM + IONO_SHELL_HEIGHT_KM)
+
+
+def calculate_mapping_function(elevation_deg):
+    """Функция отображения для однослойной модели ионосферы
+
+    Принимает и скаляры, и массивы углов места: цепочка
+    radians → sin → arcsin → cos выполняется ufunc-проходом по всему
+    массиву за один вызов.
+    """
+    # Угол места в точке прокола ионосферы
+    sin_E_prime = _MAPPING_K * np.sin(np.radians(elevation_deg))
+
+    # Функция отображения
+    return 1.0 / np.cos(np.arcsin(sin_E_prime))
+
+
 def plot_ionospheric_delays_moscow(
     maps,
     header,
     satellites_data,
     moscow_coords=(55.7558, 37.6173),
     selected_prns=[1, 2, 3],
-    glonass_freq=1602e6,
+    glonass_freq=GLONASS_L1_FREQ,
 ):
     """
     Рассчитывает и строит график ионосферной задержки для выбранных спутников ГЛОНАСС в Москве
@@ -684,6 +779,10 @@ def plot_ionospheric_delays_moscow(
 
     moscow_lat, moscow_lon = moscow_coords
 
+    # Эпохи карт отсортированы по времени — окружающий слой находим
+    # бинарным поиском вместо линейного прохода по всем картам
+    map_epochs = [m["epoch"] for m in maps]
+
     # Функция для интерполяции VTEC в произвольной точке
     def get_vtec_at_point(tec_map, lat, lon, header):
         """Интерполяция VTEC в заданной точке"""
@@ -730,6 +829,30 @@ def plot_ionospheric_delays_moscow(
 
         return vtec
 
+    def get_vtec_at_time(lat, lon, epoch):
+        """VTEC в точке с линейной интерполяцией по времени между картами
+
+        TEC меняется непрерывно, поэтому вместо выбора ближайшей карты
+        берем два окружающих слоя и взвешиваем их билинейные значения
+        долями (1-ft, ft) — один проход по 8 вершинам куба (lat, lon, t).
+        """
+        # Карты в IONEX идут в хронологическом порядке
+        if epoch <= map_epochs[0]:
+            return get_vtec_at_point(maps[0]["tec"], lat, lon, header)
+        if epoch >= map_epochs[-1]:
+            return get_vtec_at_point(maps[-1]["tec"], lat, lon, header)
+
+        j = bisect_left(map_epochs, epoch)
+
+        map0 = maps[j - 1]
+        map1 = maps[j]
+        dt = (map1["epoch"] - map0["epoch"]).total_seconds()
+        ft = (epoch - map0["epoch"]).total_seconds() / dt if dt > 0 else 0.0
+
+        vtec0 = get_vtec_at_point(map0["tec"], lat, lon, header)
+        vtec1 = get_vtec_at_point(map1["tec"], lat, lon, header)
+        return vtec0 * (1 - ft) + vtec1 * ft
+
     def calculate_elevation_azimuth(sat_lat, sat_lon, sat_height, user_lat, user_lon):
         """
         Рассчитывает угол места и азимут спутника относительно пользователя
@@ -782,117 +905,101 @@ def plot_ionospheric_delays_moscow(
         azimuth = np.degrees(np.arctan2(y, x))
 
         # Нормализуем азимут в диапазон [0, 360)
-        if azimuth < 0:
-            azimuth += 360
+        # (np.where работает и для скаляров, и для массивов эпох)
+        azimuth = np.where(azimuth < 0, azimuth + 360, azimuth)
 
         return elevation, azimuth, sat_distance
 
-    def calculate_mapping_function(elevation_deg, h=450.0, R=6371.0):
-        """Функция отображения для однослойной модели ионосферы"""
-        E = np.radians(elevation_deg)
-
-        # Угол места в точке прокола ионосферы
-        sin_E_prime = (R / (R + h)) * np.sin(E)
-        E_prime = np.arcsin(sin_E_prime)
-
-        # Функция отображения
-        m = 1 / np.cos(E_prime)
-
-        return m
-
-    def calculate_ionospheric_delay(vtec, elevation_deg, frequency):
-        """Расчет ионосферной задержки"""
-        K = 40.31  # m³/s²
-        h = 450.0  # высота ионосферного слоя в км
-        R = 6371.0  # радиус Земли в км
+    def calculate_ionospheric_delay(vtec, elevation_deg, frequency, mapping=None):
+        """Расчет ионосферной задержки
 
+        mapping позволяет передать заранее посчитанную функцию
+        отображения, чтобы не повторять тригонометрию для тех же
+        углов места (например, при расчете на нескольких частотах).
+        """
         # Функция отображения
-        m = calculate_mapping_function(elevation_deg, h, R)
+        m = mapping if mapping is not None else calculate_mapping_function(
+            elevation_deg
+        )
 
         # Наклонное электронное содержание
         stec = vtec * m
 
         # Ионосферная задержка в метрах
-        delay = (K / (frequency**2)) * stec * 1e16  # TECU = 10^16 el/m²
+        delay = (K_TECU / frequency**2) * stec
 
         return delay
 
-    # Собираем данные для каждого спутника
+    # Собираем данные одним батчем по всем выбранным спутникам:
+    # геометрия, функция отображения и задержки считаются единым
+    # массивным вызовом на весь набор, без отдельного прохода на спутник
     results = {}
 
-    for prn in selected_prns:
-        if prn in satellites_data:
-            sat_data_list = satellites_data[prn]
-
-            delays = []
-            times = []
-            elevations = []
-            azimuths = []
-            distances = []
-            vtec_values = []
-
-            for sat_data in sat_data_list[
-                :20
-            ]:  # Берем первые 20 точек для каждого спутника
-                try:
-                    epoch = sat_data["epoch"]
-                    sat_lat = sat_data["lat"]
-                    sat_lon = sat_data["lon"]
-                    sat_height = sat_data["height"]
-
-                    # Находим ближайшую карту TEC по времени
-                    closest_map = None
-                    min_time_diff = timedelta(days=365)
-
-                    for tec_map_dict in maps:
-                        time_diff = abs(tec_map_dict["epoch"] - epoch)
-                        if time_diff < min_time_diff:
-                            min_time_diff = time_diff
-                            closest_map = tec_map_dict
-
-                    if closest_map is None:
-                        continue
-
-                    # Получаем VTEC в точке Москвы
-                    vtec = get_vtec_at_point(
-                        closest_map["tec"], moscow_lat, moscow_lon, header
-                    )
+    # Берем первые 20 точек для каждого спутника
+    prn_points = [
+        (prn, satellites_data[prn][:20])
+        for prn in selected_prns
+        if prn in satellites_data and satellites_data[prn]
+    ]
 
-                    # Рассчитываем угол места и азимут
-                    elevation, azimuth, distance = calculate_elevation_azimuth(
-                        sat_lat, sat_lon, sat_height, moscow_lat, moscow_lon
-                    )
+    if prn_points:
+        flat_points = [d for _, pts in prn_points for d in pts]
+        flat_prns = [prn for prn, pts in prn_points for _ in pts]
 
-                    # Рассчитываем ионосферную задержку
-                    delay = calculate_ionospheric_delay(vtec, elevation, glonass_freq)
+        sat_lats = np.array([d["lat"] for d in flat_points])
+        sat_lons = np.array([d["lon"] for d in flat_points])
+        sat_heights = np.array([d["height"] for d in flat_points])
 
-                    # Сохраняем результаты
-                    delays.append(delay)
-                    times.append(epoch)
-                    elevations.append(elevation)
-                    azimuths.append(azimuth)
-                    distances.append(distance)
-                    vtec_values.append(vtec)
+        elev_all, azim_all, dist_all = calculate_elevation_azimuth(
+            sat_lats, sat_lons, sat_heights, moscow_lat, moscow_lon
+        )
 
-                except Exception as e:
-                    print(f"Ошибка расчета для спутника R{prn:02d}: {e}")
-                    continue
+        # VTEC зависит от эпохи (интерполяция по времени), поэтому
+        # остается скалярный проход; ошибки помечаются NaN
+        vtec_all = np.empty(len(flat_points))
+        for k, sat_data in enumerate(flat_points):
+            try:
+                vtec_all[k] = get_vtec_at_time(
+                    moscow_lat, moscow_lon, sat_data["epoch"]
+                )
+            except Exception as e:
+                print(f"Ошибка расчета для спутника R{flat_prns[k]:02d}: {e}")
+                vtec_all[k] = np.nan
 
-            if delays:  # Если есть данные
-                results[prn] = {
-                    "delays": delays,
-                    "times": times,
-                    "elevations": elevations,
-                    "azimuths": azimuths,
-                    "distances": distances,
-                    "vtec": vtec_values,
-                }
+        # Функция отображения и задержки — один вызов на весь батч
+        m_all = calculate_mapping_function(elev_all)
+        delays_all = calculate_ionospheric_delay(
+            vtec_all, elev_all, glonass_freq, mapping=m_all
+        )
+
+        # Раскладываем батч обратно по спутникам
+        valid = ~np.isnan(vtec_all)
+        offset = 0
+        for prn, pts in prn_points:
+            sl = slice(offset, offset + len(pts))
+            offset += len(pts)
+
+            ok = valid[sl]
+            if not ok.any():
+                continue
+
+            results[prn] = {
+                "delays": delays_all[sl][ok],
+                "times": [d["epoch"] for d, good in zip(pts, ok) if good],
+                "elevations": elev_all[sl][ok],
+                "azimuths": azim_all[sl][ok],
+                "distances": dist_all[sl][ok],
+                "vtec": vtec_all[sl][ok],
+            }
 
     # Если нет данных для построения
     if not results:
         print("Нет данных для построения графика!")
         return None
 
+    # matplotlib загружается только когда есть что рисовать
+    plt = _plt()
+
     # Создаем графики
     fig, axes = plt.subplots(3, 2, figsize=(16, 12))
     fig.suptitle(
@@ -1014,7 +1121,9 @@ def plot_ionospheric_delays_moscow(
     stats_text += "=" * 40 + "\n"
 
     for prn, data in results.items():
-        if data["delays"]:
+        # delays — numpy-массив: истинность многоэлементного массива
+        # неоднозначна, проверяем длину
+        if len(data["delays"]):
             stats_text += f"\nСпутник R{prn:02d}:\n"
             stats_text += f"  Макс. задержка: {max(data['delays']):.3f} м\n"
             stats_text += f"  Мин. задержка: {min(data['delays']):.3f} м\n"
@@ -1051,7 +1160,7 @@ def plot_ionospheric_delays_moscow(
     print(f"Количество временных точек: {len(maps)}")
 
     for prn, data in results.items():
-        if data["delays"]:
+        if len(data["delays"]):
             print(f"\n{'─'*40}")
             print(f"СПУТНИК R{prn:02d}:")
             print(f"  Количество точек: {len(data['delays'])}")
@@ -1089,9 +1198,6 @@ def plot_ionospheric_delays_moscow(
 
 # Основная программа
 if __name__ == "__main__":
-    import matplotlib.pyplot as plt
-    from mpl_toolkits.mplot3d import Axes3D
-
     # Парсим файл IONEX
     ionex_file = "IACG0010.21I"
     print(f"Парсинг файла IONEX: {ionex_file}")
@@ -1140,7 +1246,7 @@ if __name__ == "__main__":
                 satellites_data,  # данные из parse_glonass_nav()
                 moscow_coords=(55.7558, 37.6173),  # координаты Москвы
                 selected_prns=[1, 2, 3],  # какие спутники анализировать
-                glonass_freq=1602e6,  # частота ГЛОНАСС L1
+                glonass_freq=GLONASS_L1_FREQ,  # частота ГЛОНАСС L1
             )
 
         except FileNotFoundError:
@@ -1,12 +1,140 @@
+import concurrent.futures
+import functools
+import json
 import numpy as np
 import os
 import re
 import requests
+import shutil
+import sys
+
+# numba не обязателен: при наличии пакетные выборки высот идут через
+# JIT-ядро, иначе остается векторный путь на NumPy
+try:
+    from numba import njit, prange
+
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+# Все нужные параметры PDS-метки извлекаются одним проходом finditer,
+# вместо отдельного re.search на каждый ключ (каждый из которых заново
+# сканирует файл с начала)
+_PDS_LABEL_RE = re.compile(
+    r"^\s*(LINE_SAMPLES|LINES|SCALING_FACTOR|OFFSET|SAMPLE_BITS|SAMPLE_TYPE"
+    r"|FILE_RECORDS|RECORD_BYTES|MAP_RESOLUTION|MAP_SCALE|MINIMUM|MAXIMUM"
+    r"|CENTER_LONGITUDE|FILE_NAME|PRODUCT_ID)"
+    r"\s*=\s*\"?([^\"\r\n<]+?)\"?\s*(?:<[^>\r\n]*>)?\s*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# Типы значений метки: какие ключи приводить к float, какие оставлять
+# строками (остальные — int). Константы модуля, а не локальные множества
+_PDS_FLOAT_KEYS = frozenset(
+    {
+        "scaling_factor",
+        "offset",
+        "map_scale",
+        "minimum",
+        "maximum",
+        "center_longitude",
+    }
+)
+_PDS_STRING_KEYS = frozenset({"sample_type", "file_name", "product_id"})
+
+# Параметры ldem_64 по умолчанию: единый источник констант вместо
+# повторяющихся литералов в params.get(...) по всему модулю
+_DEFAULT_PARAMS = {
+    "lines": 11520,
+    "line_samples": 23040,
+    "scaling_factor": 0.5,
+    "offset": 1737400.0,
+    "map_resolution": 64,
+    "map_scale": 473.802,
+    "center_longitude": 180.0,
+}
+
+# Грамматика ввода координат ("n50 w70", "s30.5 e45") одним выражением:
+# без lower()/split() и цепочки веток на каждый запрос
+_COORD_RE = re.compile(
+    r"\s*([nNsS])\s*(\d+(?:\.\d+)?)\s+([eEwW])\s*(\d+(?:\.\d+)?)\s*"
+)
+
+
+class _ProgressReader:
+    """Обертка потока: считает байты и печатает прогресс раз в 32 МБ
+
+    Печать на каждый прочитанный блок упирается в терминал, а не в сеть:
+    форматирование строк и flush стоят дороже самого чтения. Отчет раз
+    в 32 МБ убирает >99% обращений к stdout при том же внешнем виде.
+    """
+
+    REPORT_EVERY = 32 << 20  # байт между отчетами
+
+    def __init__(self, raw, total_size):
+        self._raw = raw
+        self._total = total_size
+        self._read_bytes = 0
+        self._last_report = 0
+
+    def read(self, size=-1):
+        chunk = self._raw.read(size)
+        self._read_bytes += len(chunk)
+        if self._read_bytes - self._last_report >= self.REPORT_EVERY:
+            self._last_report = self._read_bytes
+            if self._total > 0:
+                percent = self._read_bytes / self._total * 100
+                sys.stdout.write(
+                    f"Прогресс: {percent:.1f}% "
+                    f"({self._read_bytes/(1024*1024):.1f}/{self._total/(1024*1024):.1f} MB)\r"
+                )
+            else:
+                sys.stdout.write(f"Скачано: {self._read_bytes/(1024*1024):.1f} MB\r")
+            sys.stdout.flush()
+        return chunk
+
+
+def _download_range(session, url, fd, start, end):
+    """Скачивает диапазон байтов [start, end] и пишет его по смещению
+
+    Каждый поток держит свое TCP-соединение, поэтому окно перегрузки
+    растет независимо и суммарная скорость не упирается в один поток.
+    Запись через os.pwrite не требует общей позиции файла и блокировок.
+    """
+    response = session.get(
+        url,
+        headers={"Range": f"bytes={start}-{end}"},
+        stream=True,
+        timeout=30,
+    )
+    response.raise_for_status()
+    if response.status_code != 206:
+        raise requests.exceptions.RequestException(
+            f"Сервер не поддерживает Range-запросы (код {response.status_code})"
+        )
+
+    offset = start
+    for chunk in response.iter_content(chunk_size=1024 * 1024):
+        if chunk:
+            os.pwrite(fd, chunk, offset)
+            offset += len(chunk)
 
 
-def download_img(url=None, filename="ldem_64.img", save_path=None):
+def download_img(
+    url=None,
+    filename="ldem_64.img",
+    save_path=None,
+    num_streams=8,
+    chunk_size=1024 * 1024,
+):
     """
     Скачивает файл ldem_64.img с сайта PDS Geosciences
+
+    Если сервер поддерживает Range-запросы, файл качается num_streams
+    параллельными потоками по равным диапазонам байтов — один TCP-поток
+    не заполняет произведение RTT на полосу для файла в сотни мегабайт.
+    Иначе происходит обычная последовательная загрузка.
     """
     # Стандартный URL если не указан другой
     if url is None:
@@ -22,29 +150,69 @@ def download_img(url=None, filename="ldem_64.img", save_path=None):
         print(f"Начинаю загрузку файла с URL: {url}")
         print(f"Файл будет сохранен как: {save_path}")
 
+        # Сессия переиспользует TCP-соединение при повторных запросах
+        # и явно разрешает сжатие ответа
+        session = requests.Session()
+        session.headers["Accept-Encoding"] = "gzip, deflate"
+
+        # Узнаем размер и поддержку Range-запросов одним HEAD-запросом
+        head = session.head(url, timeout=30, allow_redirects=True)
+        head.raise_for_status()
+        total_size = int(head.headers.get("content-length", 0))
+        accept_ranges = head.headers.get("accept-ranges", "").lower() == "bytes"
+
+        if total_size > 0 and accept_ranges and num_streams > 1:
+            print(f"Размер файла: {total_size / (1024*1024):.2f} MB")
+            print(f"Параллельная загрузка в {num_streams} потоков...")
+
+            # Делим файл на равные диапазоны; каждый поток пишет свой
+            # участок по абсолютному смещению, итоговый файл собирается
+            # без промежуточных временных файлов
+            segment = total_size // num_streams
+            ranges = [
+                (k * segment, (k + 1) * segment - 1 if k < num_streams - 1 else total_size - 1)
+                for k in range(num_streams)
+            ]
+
+            try:
+                with open(save_path, "wb") as file:
+                    fd = file.fileno()
+                    # Заранее задаем итоговый размер: записи по смещениям
+                    # не наращивают файл наперегонки, метаданные меняются
+                    # один раз
+                    os.ftruncate(fd, total_size)
+                    with concurrent.futures.ThreadPoolExecutor(
+                        max_workers=num_streams
+                    ) as pool:
+                        futures = [
+                            pool.submit(_download_range, session, url, fd, a, b)
+                            for a, b in ranges
+                        ]
+                        for future in concurrent.futures.as_completed(futures):
+                            future.result()  # пробрасываем ошибки потоков
+
+                print(f"Файл успешно скачан: {save_path}")
+                return save_path
+            except requests.exceptions.RequestException as e:
+                # Сервер ответил 200 вместо 206 или оборвал диапазон —
+                # откатываемся на обычную последовательную загрузку
+                print(f"Параллельная загрузка не удалась ({e}), качаю одним потоком")
+
         # Отправляем GET запрос с потоковой передачей данных
-        response = requests.get(url, stream=True, timeout=30)
+        response = session.get(url, stream=True, timeout=30)
         response.raise_for_status()  # Проверяем на ошибки HTTP
 
         # Получаем размер файла
         file_size = int(response.headers.get("content-length", 0))
         print(f"Размер файла: {file_size / (1024*1024):.2f} MB")
 
-        # Скачиваем файл
+        # Скачиваем файл: copyfileobj гоняет цикл чтение-запись в C,
+        # без питоновской итерации по чанкам и печати на каждый чанк
+        response.raw.decode_content = True
         with open(save_path, "wb") as file:
-            downloaded = 0
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    file.write(chunk)
-                    downloaded += len(chunk)
-
-                    # Выводим прогресс
-                    if file_size > 0:
-                        percent = (downloaded / file_size) * 100
-                        print(
-                            f"Прогресс: {percent:.1f}% ({downloaded/(1024*1024):.1f}/{file_size/(1024*1024):.1f} MB)",
-                            end="\r",
-                        )
+            shutil.copyfileobj(
+                _ProgressReader(response.raw, file_size), file, length=chunk_size
+            )
 
         print(f"\nФайл успешно скачан: {save_path}")
         return save_path
@@ -57,6 +225,43 @@ def download_img(url=None, filename="ldem_64.img", save_path=None):
         return None
 
 
+def _raster_stats(raster, block_rows=1024):
+    """Минимум, максимум и среднее одним потоковым проходом
+
+    Высоты получены из int16 умножением на скаляр, NaN в них не бывает —
+    nan-варианты редукций не нужны. Вместо трех полных проходов по ~1 ГБ
+    (nanmin, nanmax, nanmean) растр читается блоками строк: блок попадает
+    в кеш, и все три редукции по нему считаются без повторного чтения
+    из памяти.
+    """
+    mn = np.inf
+    mx = -np.inf
+    total = 0.0
+    for row in range(0, raster.shape[0], block_rows):
+        block = raster[row : row + block_rows]
+        mn = min(mn, float(block.min()))
+        mx = max(mx, float(block.max()))
+        total += float(block.sum(dtype=np.float64))
+    return mn, mx, total / raster.size
+
+
+if NUMBA_AVAILABLE:
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _lookup_batch(lats, lons, data, lines, line_samples, lon_shift, scale, out):
+        # Координатная арифметика, выборка и масштабирование слиты в
+        # один параллельный цикл без промежуточных массивов NumPy
+        y_scale = (lines - 1) / 180.0
+        x_scale = (line_samples - 1) / 360.0
+        for i in prange(lats.size):
+            y = int((90.0 - lats[i]) * y_scale)
+            y = max(0, min(lines - 1, y))
+            lon_norm = (lons[i] + lon_shift) % 360.0
+            x = int(lon_norm * x_scale)
+            x = max(0, min(line_samples - 1, x))
+            out[i] = data[y, x] * scale
+
+
 def parse_pds_label_detailed(label_file):
     """Парсит PDS .lbl файл и извлекает ВСЕ параметры данных"""
     params = {}
@@ -65,53 +270,21 @@ def parse_pds_label_detailed(label_file):
         with open(label_file, "r", encoding="utf-8") as f:
             content = f.read()
 
-        # Важно: ищем SAMPLE_TYPE для определения порядка байтов
-        patterns = {
-            "lines": r"LINES\s*=\s*(\d+)",
-            "line_samples": r"LINE_SAMPLES\s*=\s*(\d+)",
-            "scaling_factor": r"SCALING_FACTOR\s*=\s*([\d\.\-]+)",
-            "offset": r"OFFSET\s*=\s*([\d\.\-]+)",
-            "sample_bits": r"SAMPLE_BITS\s*=\s*(\d+)",
-            "sample_type": r"SAMPLE_TYPE\s*=\s*\"([^\"]+)\"",  # Ключевой параметр!
-            "file_records": r"FILE_RECORDS\s*=\s*(\d+)",
-            "record_bytes": r"RECORD_BYTES\s*=\s*(\d+)",
-            "map_resolution": r"MAP_RESOLUTION\s*=\s*(\d+)",
-            "map_scale": r"MAP_SCALE\s*=\s*([\d\.]+)",
-            "minimum": r"MINIMUM\s*=\s*([\d\.\-]+)",
-            "maximum": r"MAXIMUM\s*=\s*([\d\.\-]+)",
-            "center_longitude": r"CENTER_LONGITUDE\s*=\s*([\d\.]+)\s*<deg>",
-        }
-
-        for key, pattern in patterns.items():
-            match = re.search(pattern, content, re.IGNORECASE)
-            if match:
+        # Важно: ищем SAMPLE_TYPE для определения порядка байтов.
+        # Один линейный проход по содержимому вместо 15 отдельных re.search
+        for match in _PDS_LABEL_RE.finditer(content):
+            key = match.group(1).lower()
+            if key in params:
+                continue  # как и re.search, берем первое вхождение
+
+            value = match.group(2).strip()
+            if key in _PDS_STRING_KEYS:
+                params[key] = value
+            else:
                 try:
-                    if key in [
-                        "scaling_factor",
-                        "offset",
-                        "map_scale",
-                        "minimum",
-                        "maximum",
-                        "center_longitude",
-                    ]:
-                        params[key] = float(match.group(1))
-                    elif key == "sample_type":
-                        params[key] = match.group(1)
-                    else:
-                        params[key] = int(match.group(1))
+                    params[key] = float(value) if key in _PDS_FLOAT_KEYS else int(value)
                 except ValueError:
-                    params[key] = match.group(1)
-
-        # Извлекаем строковые параметры
-        string_patterns = {
-            "file_name": r"FILE_NAME\s*=\s*\"([^\"]+)\"",
-            "product_id": r"PRODUCT_ID\s*=\s*\"([^\"]+)\"",
-        }
-
-        for key, pattern in string_patterns.items():
-            match = re.search(pattern, content, re.IGNORECASE)
-            if match:
-                params[key] = match.group(1)
+                    params[key] = value
 
         print("✓ Параметры успешно извлечены из PDS файла:")
         print(f"  Порядок байтов: {params.get('sample_type', 'не указан')}")
@@ -136,10 +309,10 @@ def convert_ldem_to_meters_corrected(label_file):
         return None
 
     # Основные параметры
-    SCALING_FACTOR = params.get("scaling_factor", 0.5)
-    OFFSET = params.get("offset", 1737400.0)
-    NROWS = params.get("lines", 11520)
-    NCOLS = params.get("line_samples", 23040)
+    SCALING_FACTOR = params.get("scaling_factor", _DEFAULT_PARAMS["scaling_factor"])
+    OFFSET = params.get("offset", _DEFAULT_PARAMS["offset"])
+    NROWS = params.get("lines", _DEFAULT_PARAMS["lines"])
+    NCOLS = params.get("line_samples", _DEFAULT_PARAMS["line_samples"])
     SAMPLE_BITS = params.get("sample_bits", 16)
     SAMPLE_TYPE = params.get("sample_type", "LSB_INTEGER")
     input_file = params.get("file_name", "ldem_64.img")
@@ -167,53 +340,68 @@ def convert_ldem_to_meters_corrected(label_file):
     else:
         dtype = ">i4"  # по умолчанию big-endian int32
 
-    # Читаем бинарные данные
-    print("📥 Чтение данных...")
-    try:
-        with open(input_file, "rb") as f:
-            data = np.fromfile(f, dtype=dtype)
-    except Exception as e:
-        print(f"✗ Ошибка чтения файла: {e}")
-        # Пробуем альтернативный порядок байтов
-        print("ℹ Пробую альтернативный порядок байтов...")
-        try:
-            if dtype == "<i2":
-                alt_dtype = ">i2"
-            else:
-                alt_dtype = "<i2"
-
-            with open(input_file, "rb") as f:
-                data = np.fromfile(f, dtype=alt_dtype)
-            print(f"✓ Успешно с {alt_dtype}")
-        except Exception as e2:
-            print(f"✗ Ошибка с альтернативным порядком: {e2}")
-            return None
-
-    # Проверяем размер данных
+    # Проверяем размер данных по размеру файла, не читая его
     expected_size = NCOLS * NROWS
-    if len(data) != expected_size:
+    itemsize = np.dtype(dtype).itemsize
+    actual_size = os.path.getsize(input_file) // itemsize
+
+    if actual_size != expected_size:
         print(
-            f"⚠ Предупреждение: ожидалось {expected_size} значений, получено {len(data)}"
+            f"⚠ Предупреждение: ожидалось {expected_size} значений, получено {actual_size}"
         )
-        # Обрезаем до ожидаемого размера
-        if len(data) > expected_size:
-            data = data[:expected_size]
-            print(f"ℹ Обрезано до {expected_size} значений")
+        if actual_size > expected_size:
+            print(f"ℹ Используем первые {expected_size} значений")
         else:
             print(f"ℹ Файл меньше ожидаемого, возможно поврежден")
             return None
 
-    # Изменяем форму массива
-    data = data.reshape(NROWS, NCOLS)
+    # Отображаем файл в память вместо чтения целиком:
+    # ОС подгружает страницы по мере обращения
+    print("📥 Чтение данных...")
+    try:
+        data = np.memmap(input_file, dtype=dtype, mode="r", shape=(NROWS, NCOLS))
+    except Exception as e:
+        print(f"✗ Ошибка чтения файла: {e}")
+        return None
+
+    # Проверяем порядок байтов по данным, а не через повторное чтение:
+    # при неверном порядке высоты первых строк выходят далеко за
+    # реалистичный для Луны диапазон — тогда просто меняем dtype
+    # и перестраиваем отображение (сам файл заново не читается)
+    sample = data[: min(64, NROWS)]
+    sample_min = float(sample.min()) * SCALING_FACTOR
+    sample_max = float(sample.max()) * SCALING_FACTOR
+    if sample_min < -10000 or sample_max > 10000:
+        swapped = np.dtype(dtype).newbyteorder().str
+        print(
+            f"⚠ Высоты {sample_min:.0f}...{sample_max:.0f} м вне диапазона, "
+            f"пробуем порядок байтов {swapped}"
+        )
+        dtype = swapped
+        data = np.memmap(input_file, dtype=dtype, mode="r", shape=(NROWS, NCOLS))
 
-    # Преобразование в метры
+    # Преобразование в метры: потоково, блоками строк, сразу в выходной
+    # memmap — без промежуточного массива размером с весь растр
     print("🔄 Преобразование в метры...")
-    elevation_meters = data.astype(np.float32) * SCALING_FACTOR
+    elevation_meters = np.memmap(
+        output_file, dtype=np.float32, mode="w+", shape=(NROWS, NCOLS)
+    )
+
+    block_rows = 1024
+    for row in range(0, NROWS, block_rows):
+        row_end = min(row + block_rows, NROWS)
+        # Умножение пишет сразу в выходной memmap: без float32-копии
+        # блока от astype и без второго временного массива от умножения
+        np.multiply(
+            data[row:row_end],
+            SCALING_FACTOR,
+            out=elevation_meters[row:row_end],
+            casting="unsafe",
+        )
+    elevation_meters.flush()
 
     # Проверяем диапазон значений
-    min_val = np.nanmin(elevation_meters)
-    max_val = np.nanmax(elevation_meters)
-    mean_val = np.nanmean(elevation_meters)
+    min_val, max_val, mean_val = _raster_stats(elevation_meters)
 
     print(f"📈 Проверка диапазона:")
     print(f"   Минимум: {min_val:.1f} м")
@@ -227,13 +415,11 @@ def convert_ldem_to_meters_corrected(label_file):
         print(f"   Получено: {min_val:.0f}...+{max_val:.0f} м")
         print(f"   Возможно неверный порядок байтов или scaling factor")
 
-    # Сохраняем результат
-    print("💾 Сохранение результата...")
-    elevation_meters.astype(np.float32).tofile(output_file)
-
-    # Сохраняем параметры для использования
-    params_file = "ldem_64_params_corrected.npy"
-    np.save(params_file, params)
+    # Сохраняем параметры для использования: плоский словарь скаляров —
+    # обычный JSON вместо np.save, который пиклит dict через object-массив
+    params_file = "ldem_64_params_corrected.json"
+    with open(params_file, "w") as f:
+        json.dump(params, f, indent=2, ensure_ascii=False)
     print(f"✓ Параметры сохранены в {params_file}")
     print(f"✓ Высоты сохранены в {output_file}")
 
@@ -246,111 +432,192 @@ class CylindricalLunarDEMCorrected:
     def __init__(
         self,
         data_file="ldem_64_meters_corrected.dat",
-        params_file="ldem_64_params_corrected.npy",
+        params_file="ldem_64_params_corrected.json",
     ):
         """
         Инициализация DEM с исправленными параметрами
         """
         self.data_file = data_file
         self.params_file = params_file
-        self.load_data()
-
-    def load_data(self):
-        """Загружает данные и параметры"""
-        # Загружаем параметры
+        # Лениво подгружаются только растр и статистика; дешевые
+        # параметры (JSON и масштабы проекции) связываются сразу,
+        # чтобы преобразования координат и get_elevation работали
+        # и на свежесозданном экземпляре
+        self._elevation_data = None
+        self._stats = None
+        self._load_params()
+
+    def _load_params(self):
+        """Читает параметры и связывает скаляры проекции с атрибутами"""
+        # Загружаем параметры из JSON-сайдкара: без np.load с
+        # allow_pickle и распаковки dict из object-массива
         if os.path.exists(self.params_file):
-            self.params = np.load(self.params_file, allow_pickle=True).item()
+            with open(self.params_file, "r") as f:
+                self.params = json.load(f)
             print("✓ Параметры загружены")
         else:
             print("⚠ Файл параметров не найден, используем значения по умолчанию")
-            self.params = {
-                "lines": 11520,
-                "line_samples": 23040,
-                "scaling_factor": 0.5,
-                "offset": 1737400.0,
-                "map_resolution": 64,
-                "map_scale": 473.802,
-                "center_longitude": 180.0,
-            }
-
-        self.LINES = self.params["lines"]
-        self.LINE_SAMPLES = self.params["line_samples"]
-        self.SCALING_FACTOR = self.params.get("scaling_factor", 0.5)
-        self.OFFSET = self.params.get("offset", 1737400.0)
-        self.CENTER_LON = self.params.get("center_longitude", 180.0)
+            self.params = dict(_DEFAULT_PARAMS)
+
+        # Недостающие ключи добираем из общих значений по умолчанию
+        # и привязываем к атрибутам один раз — дальше по горячему пути
+        # идут обращения к атрибутам, а не dict.get с литералами
+        p = {**_DEFAULT_PARAMS, **self.params}
+        self.LINES = p["lines"]
+        self.LINE_SAMPLES = p["line_samples"]
+        self.SCALING_FACTOR = p["scaling_factor"]
+        self.OFFSET = p["offset"]
+        self.CENTER_LON = p["center_longitude"]
+
+        # Масштабы градусы->пиксели считаем один раз на экземпляр,
+        # а не два деления на каждый интерактивный запрос
+        self._y_scale = (self.LINES - 1) / 180.0
+        self._x_scale = (self.LINE_SAMPLES - 1) / 360.0
+
+        # Источник высот: предпочитаем исходный int16 .img — он вдвое
+        # меньше float32-копии (меньше диска и полосы памяти на выборку),
+        # высота получается умножением на scaling factor при чтении.
+        # Сконвертированный .dat остается как запасной вариант.
+        raw_file = self.params.get("file_name", "ldem_64.img")
+        sample_type = str(self.params.get("sample_type", "LSB_INTEGER")).upper()
+        if os.path.exists(raw_file):
+            self._source = raw_file
+            self._dtype = "<i2" if "LSB" in sample_type else ">i2"
+            self._read_scale = self.SCALING_FACTOR
+        else:
+            self._source = self.data_file
+            self._dtype = np.float32
+            self._read_scale = 1.0
+
+    def load_data(self):
+        """Открывает растр высот (параметры связаны в конструкторе)"""
+        source = self._source
+        dtype = self._dtype
 
         # Загружаем данные высот
-        print(f"📂 Загрузка данных высот из {self.data_file}...")
+        print(f"📂 Загрузка данных высот из {source}...")
 
+        # Проверяем размер по файловой системе, не читая данные
+        expected_size = self.LINES * self.LINE_SAMPLES
         try:
-            self.elevation_data = np.fromfile(self.data_file, dtype=np.float32)
-        except:
+            actual_size = os.path.getsize(source) // np.dtype(dtype).itemsize
+        except OSError:
             print("❌ Ошибка загрузки данных. Убедитесь, что файл существует.")
+            print("   Скачайте исходный ldem_64.img: download_img()")
+            return False
+
+        if actual_size != expected_size:
             print(
-                "   Запустите сначала: convert_ldem_to_meters_corrected('ldem_64.lbl')"
+                f"⚠ Предупреждение: ожидалось {expected_size} значений, получено {actual_size}"
             )
             return False
 
-        # Проверяем размер
-        expected_size = self.LINES * self.LINE_SAMPLES
-        if len(self.elevation_data) != expected_size:
-            print(
-                f"⚠ Предупреждение: ожидалось {expected_size} значений, получено {len(self.elevation_data)}"
+        # Отображаем файл в память вместо чтения ~1 ГБ целиком:
+        # для точечных запросов высоты ОС подгружает только нужные страницы,
+        # и старт программы не ждет последовательного чтения всего растра
+        try:
+            self._elevation_data = np.memmap(
+                source,
+                dtype=dtype,
+                mode="r",
+                shape=(self.LINES, self.LINE_SAMPLES),
             )
+        except Exception:
+            print("❌ Ошибка загрузки данных. Убедитесь, что файл существует.")
             return False
 
-        # Изменяем форму
-        self.elevation_data = self.elevation_data.reshape(self.LINES, self.LINE_SAMPLES)
         print(f"✅ Данные загружены: {self.LINE_SAMPLES}x{self.LINES} пикселей")
+        return True
 
-        # Вычисляем статистику
-        self.min_height = np.nanmin(self.elevation_data)
-        self.max_height = np.nanmax(self.elevation_data)
-        self.mean_height = np.nanmean(self.elevation_data)
+    @property
+    def elevation_data(self):
+        """Растр высот; открывается при первом обращении"""
+        if self._elevation_data is None:
+            self.load_data()
+        return self._elevation_data
 
-        print(f"📊 Статистика высот:")
-        print(f"   Минимум: {self.min_height:.1f} м")
-        print(f"   Максимум: {self.max_height:.1f} м")
-        print(f"   Среднее: {self.mean_height:.1f} м")
+    def _height_stats(self):
+        """Статистика высот; считается один раз при первом запросе
 
-        # Проверяем на реалистичность
-        if self.min_height < -9000 or self.max_height > 9000:
-            print("⚠ Внимание: значения могут быть некорректными!")
+        Полный проход по ~1 ГБ не выполняется на старте — только когда
+        статистика действительно нужна (команда 's').
+        """
+        if self._stats is None:
+            mn, mx, mean = _raster_stats(self.elevation_data)
+            self._stats = (
+                mn * self._read_scale,
+                mx * self._read_scale,
+                mean * self._read_scale,
+            )
 
-        return True
+            # Проверяем на реалистичность
+            if self._stats[0] < -9000 or self._stats[1] > 9000:
+                print("⚠ Внимание: значения могут быть некорректными!")
+        return self._stats
+
+    @property
+    def min_height(self):
+        return self._height_stats()[0]
+
+    @property
+    def max_height(self):
+        return self._height_stats()[1]
+
+    @property
+    def mean_height(self):
+        return self._height_stats()[2]
 
     def parse_coordinates(self, input_str):
         """
         Парсит строку с координатами
         """
-        try:
-            parts = input_str.lower().split()
-            if len(parts) != 2:
-                raise ValueError("Неверный формат. Используйте: n50 w70")
-
-            # Парсим широту
-            lat_str = parts[0]
-            if lat_str.startswith("n"):
-                latitude = float(lat_str[1:])
-            elif lat_str.startswith("s"):
-                latitude = -float(lat_str[1:])
-            else:
-                raise ValueError("Широта должна начинаться с 'n' или 's'")
-
-            # Парсим долготу
-            lon_str = parts[1]
-            if lon_str.startswith("w"):
-                longitude = -float(lon_str[1:])
-            elif lon_str.startswith("e"):
-                longitude = float(lon_str[1:])
-            else:
-                raise ValueError("Долгота должна начинаться с 'w' или 'e'")
+        # Один fullmatch компилированного выражения вместо
+        # lower()/split() и веток по префиксам
+        m = _COORD_RE.fullmatch(input_str)
+        if m is None:
+            print("❌ Ошибка: Неверный формат. Используйте: n50 w70")
+            return None, None
 
-            return latitude, longitude
+        latitude = float(m.group(2)) * (1.0 if m.group(1) in "nN" else -1.0)
+        longitude = float(m.group(4)) * (1.0 if m.group(3) in "eE" else -1.0)
 
-        except ValueError as e:
-            print(f"❌ Ошибка: {e}")
-            return None, None
+        return latitude, longitude
+
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _pixel_simple(lat, lon, lines, line_samples):
+        """Пиксель для (широта, долгота); результат кешируется
+
+        Интерактивный и тестовый режимы запрашивают одни и те же точки
+        многократно — повторные запросы отдаются из lru_cache за O(1).
+        Скалярный путь: встроенные min/max вместо np.clip, который
+        на каждый вызов оборачивает скаляр в массив.
+        """
+        # Упрощенная версия: долгота 0° = левый край,
+        # широта +90° (север) = верхний край
+        y = int((90.0 - lat) * (lines - 1) / 180.0)
+        x = int((lon % 360) * (line_samples - 1) / 360.0)
+
+        # Ограничиваем
+        x = min(max(x, 0), line_samples - 1)
+        y = min(max(y, 0), lines - 1)
+
+        return x, y
+
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _pixel_with_center(lat, lon, lines, line_samples):
+        """Пиксель с учетом центра на 180° долготы; кешируется"""
+        # Долгота 180° должна быть в центре изображения
+        lon_shifted = ((lon % 360) + 180) % 360
+
+        y = int((90.0 - lat) * (lines - 1) / 180.0)
+        x = int(lon_shifted * (line_samples - 1) / 360.0)
+
+        x = min(max(x, 0), line_samples - 1)
+        y = min(max(y, 0), lines - 1)
+
+        return x, y
 
     def coordinates_to_pixel_simple(self, lat, lon):
         """
@@ -362,22 +629,7 @@ class CylindricalLunarDEMCorrected:
             print(f"❌ Широта {lat}° вне диапазона")
             return None, None
 
-        # Нормализуем долготу 0-360
-        lon_norm = lon % 360
-
-        # Упрощенная версия: долгота 0° = левый край
-        # Широта +90° (север) = верхний край
-        lat_ratio = (90.0 - lat) / 180.0
-        y_pixel = lat_ratio * (self.LINES - 1)
-
-        lon_ratio = lon_norm / 360.0
-        x_pixel = lon_ratio * (self.LINE_SAMPLES - 1)
-
-        # Ограничиваем
-        x = int(np.clip(x_pixel, 0, self.LINE_SAMPLES - 1))
-        y = int(np.clip(y_pixel, 0, self.LINES - 1))
-
-        return x, y
+        return self._pixel_simple(lat, lon, self.LINES, self.LINE_SAMPLES)
 
     def coordinates_to_pixel_with_center(self, lat, lon):
         """
@@ -386,50 +638,90 @@ class CylindricalLunarDEMCorrected:
         if lat < -90 or lat > 90:
             return None, None
 
-        # Нормализуем долготу 0-360
-        lon_norm = lon % 360
+        return self._pixel_with_center(lat, lon, self.LINES, self.LINE_SAMPLES)
 
-        # С учетом центра на 180°
-        # Долгота 180° должна быть в центре изображения
-        lon_shifted = (lon_norm + 180) % 360
+    def get_elevation(self, x, y):
+        """Получает высоту в пиксельных координатах"""
+        if x < 0 or x >= self.LINE_SAMPLES or y < 0 or y >= self.LINES:
+            return None
 
-        lat_ratio = (90.0 - lat) / 180.0
-        y_pixel = lat_ratio * (self.LINES - 1)
+        # Ближайший пиксель; для int16-источника масштаб дает метры
+        height = self.elevation_data[y, x]
+        return float(height) * self._read_scale
 
-        lon_ratio = lon_shifted / 360.0
-        x_pixel = lon_ratio * (self.LINE_SAMPLES - 1)
+    def _pixel_arrays(self, lats, lons, center_180=False):
+        """Пиксельные индексы сразу для массивов координат"""
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
 
-        x = int(np.clip(x_pixel, 0, self.LINE_SAMPLES - 1))
-        y = int(np.clip(y_pixel, 0, self.LINES - 1))
+        lon_norm = np.mod(lons, 360.0)
+        if center_180:
+            lon_norm = np.mod(lon_norm + 180.0, 360.0)
 
+        y = np.clip(
+            ((90.0 - lats) * self._y_scale).astype(np.int32),
+            0,
+            self.LINES - 1,
+        )
+        x = np.clip(
+            (lon_norm * self._x_scale).astype(np.int32),
+            0,
+            self.LINE_SAMPLES - 1,
+        )
         return x, y
 
-    def get_elevation(self, x, y):
-        """Получает высоту в пиксельных координатах"""
-        if x < 0 or x >= self.LINE_SAMPLES or y < 0 or y >= self.LINES:
-            return None
+    def get_elevations(self, lats, lons, center_180=False):
+        """Высоты для массивов координат одной выборкой
 
-        # Ближайший пиксель
-        height = self.elevation_data[y, x]
-        return float(height)
+        Вместо питоновского цикла по точкам с поэлементными вызовами
+        coordinates_to_pixel_* и get_elevation: индексы считаются
+        векторно, высоты забираются одним fancy-indexing по растру.
+        При установленном numba работает JIT-ядро, которое сливает
+        арифметику и выборку в один параллельный цикл.
+        """
+        if NUMBA_AVAILABLE:
+            lats = np.ascontiguousarray(lats, dtype=np.float64)
+            lons = np.ascontiguousarray(lons, dtype=np.float64)
+            out = np.empty(lats.size, dtype=np.float32)
+            _lookup_batch(
+                lats,
+                lons,
+                self.elevation_data,
+                self.LINES,
+                self.LINE_SAMPLES,
+                180.0 if center_180 else 0.0,
+                self._read_scale,
+                out,
+            )
+            return out
+
+        x, y = self._pixel_arrays(lats, lons, center_180)
+        return self.elevation_data[y, x] * np.float32(self._read_scale)
 
     def test_coordinates(self, test_points):
         """Тестирование нескольких известных точек"""
         print("\n🧪 ТЕСТИРОВАНИЕ КООРДИНАТ:")
         print("-" * 70)
 
-        for name, lat, lon in test_points:
-            # Пробуем оба метода
-            x1, y1 = self.coordinates_to_pixel_simple(lat, lon)
-            x2, y2 = self.coordinates_to_pixel_with_center(lat, lon)
+        names = [p[0] for p in test_points]
+        lats = np.array([p[1] for p in test_points], dtype=np.float64)
+        lons = np.array([p[2] for p in test_points], dtype=np.float64)
 
-            height1 = self.get_elevation(x1, y1) if x1 is not None else None
-            height2 = self.get_elevation(x2, y2) if x2 is not None else None
+        # Оба метода считаются пакетно: по одной выборке на метод
+        x1, y1 = self._pixel_arrays(lats, lons)
+        x2, y2 = self._pixel_arrays(lats, lons, center_180=True)
+        heights1 = self.elevation_data[y1, x1] * np.float32(self._read_scale)
+        heights2 = self.elevation_data[y2, x2] * np.float32(self._read_scale)
 
+        for k, name in enumerate(names):
             print(f"\n📍 {name}:")
-            print(f"   Координаты: {lat}°N, {lon}°E")
-            print(f"   Метод 1 (простой): пиксель ({x1}, {y1}) = {height1:.1f} м")
-            print(f"   Метод 2 (с центром): пиксель ({x2}, {y2}) = {height2:.1f} м")
+            print(f"   Координаты: {lats[k]:g}°N, {lons[k]:g}°E")
+            print(
+                f"   Метод 1 (простой): пиксель ({x1[k]}, {y1[k]}) = {heights1[k]:.1f} м"
+            )
+            print(
+                f"   Метод 2 (с центром): пиксель ({x2[k]}, {y2[k]}) = {heights2[k]:.1f} м"
+            )
 
     def interactive_mode(self):
         """Интерактивный режим"""
@@ -513,13 +805,22 @@ if __name__ == "__main__":
     else:
         print("✓ Файлы ldem_64.img и ldem_64.lbl найдены")
 
-    print("\n3. Конвертируем данные с правильным порядком байтов...")
-    params = convert_ldem_to_meters_corrected(lbl_file)
+    # Конвертация в float32 больше не нужна: высоты читаются прямо из
+    # исходного int16 .img с умножением на scaling factor при выборке.
+    # convert_ldem_to_meters_corrected остается для внешних потребителей,
+    # которым нужен float32-растр.
+    print("\n3. Читаем параметры из PDS-метки...")
+    params = parse_pds_label_detailed(lbl_file)
 
     if params:
-        print("\n4. Загружаем исправленные данные...")
+        params_file = "ldem_64_params_corrected.json"
+        with open(params_file, "w") as f:
+            json.dump(params, f, indent=2, ensure_ascii=False)
+        print(f"✓ Параметры сохранены в {params_file}")
+
+        print("\n4. Загружаем данные...")
         dem = CylindricalLunarDEMCorrected()
         if dem.load_data():
             dem.interactive_mode()
     else:
-        print("❌ Конвертация не удалась")
+        print("❌ Не удалось прочитать PDS-метку")
@@ -1,16 +1,216 @@
+import concurrent.futures
+import json
 import numpy as np
 import os
 import re
 import requests
-import warnings
 
-warnings.filterwarnings("ignore")
+# numexpr не обязателен: при наличии масштабирование растра выполняется
+# им (многопоточно, SIMD, без временных массивов), иначе — через NumPy
+try:
+    import numexpr as ne
+
+    # Явно отдаем numexpr все ядра: масштабирование упирается в память,
+    # и потоки по числу ядер насыщают все каналы DRAM
+    ne.set_num_threads(os.cpu_count() or 1)
+    NUMEXPR_AVAILABLE = True
+except ImportError:
+    NUMEXPR_AVAILABLE = False
+
+# numba тоже не обязателен: статистика по растру при его наличии
+# считается JIT-ядром в один параллельный проход
+try:
+    from numba import njit, prange
+
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# zstandard не обязателен: явный формат вывода "zst" пишет поток zstd,
+# который на float32-растрах в разы быстрее zlib из savez_compressed
+# при сравнимой степени сжатия. По умолчанию ("npz") и без zstandard
+# остается обычный .npz — его читает поисковик высот из polar/main.py
+try:
+    import zstandard as zstd
+
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+
+# Все пары КЛЮЧ = значение метки извлекаются одним проходом finditer:
+# отдельный re.search на каждый из ~22 ключей сканировал одно и то же
+# содержимое с начала столько же раз
+_POLAR_LABEL_RE = re.compile(
+    r"^\s*(\w+)\s*=\s*\"?([^\"\r\n<]+?)\"?\s*(?:<[^>\r\n]*>)?\s*$",
+    re.MULTILINE,
+)
+
+# Какие ключи метки нас интересуют (в нижнем регистре)
+_POLAR_KEYS = frozenset(
+    {
+        # Основные параметры изображения
+        "lines",
+        "line_samples",
+        "scaling_factor",
+        "offset",
+        "sample_bits",
+        # Параметры файла
+        "file_records",
+        "record_bytes",
+        # Параметры проекции (особенно важные для полярной)
+        "map_projection_type",
+        "map_scale",
+        "center_latitude",
+        "center_longitude",
+        "minimum_latitude",
+        "maximum_latitude",
+        # Смещения проекции (ключевые для преобразования координат)
+        "sample_projection_offset",
+        "line_projection_offset",
+        # Радиусы осей
+        "a_axis_radius",
+        "b_axis_radius",
+        "c_axis_radius",
+        # Дополнительные параметры
+        "derived_minimum",
+        "derived_maximum",
+        # Строковые параметры
+        "file_name",
+        "product_id",
+    }
+)
+
+_POLAR_STRING_KEYS = frozenset({"map_projection_type", "file_name", "product_id"})
+
+# Значения по умолчанию для отсутствующих в метке параметров. Парсер
+# гарантированно заполняет эти ключи, поэтому дальше по коду они
+# читаются прямой индексацией без .get с дублирующимися литералами
+_POLAR_DEFAULTS = {
+    "sample_bits": 16,
+    "scaling_factor": 0.5,
+    "offset": 1737400.0,
+    "map_scale": 100.0,
+    "center_latitude": 90.0,
+    "center_longitude": 0.0,
+    "a_axis_radius": 1737.4,
+    "b_axis_radius": 1737.4,
+    "c_axis_radius": 1737.4,
+}
+
+# Ключи с вещественными значениями: frozenset вместо списка в условии —
+# проверка принадлежности за O(1)
+_POLAR_FLOAT_KEYS = frozenset(
+    {
+        "scaling_factor",
+        "offset",
+        "map_scale",
+        "center_latitude",
+        "center_longitude",
+        "minimum_latitude",
+        "maximum_latitude",
+        "sample_projection_offset",
+        "line_projection_offset",
+        "a_axis_radius",
+        "b_axis_radius",
+        "c_axis_radius",
+        "derived_minimum",
+        "derived_maximum",
+    }
+)
+
+
+if NUMBA_AVAILABLE:
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _to_geo_kernel(xs, ys, R, center_lon, lat_out, lon_out):
+        # Вся цепочка sqrt/arctan/arctan2/degrees/модуль — в одном
+        # параллельном цикле: один проход записи вместо ~7 полных
+        # промежуточных массивов векторной версии
+        for i in prange(ys.size):
+            y = ys[i]
+            for j in range(xs.size):
+                x = xs[j]
+                r = np.sqrt(x * x + y * y)
+                chi = 2.0 * np.arctan(r / (2.0 * R))
+                lat_out[i, j] = 90.0 - np.degrees(chi)
+                lon = np.degrees(np.arctan2(y, x)) + center_lon
+                lon_out[i, j] = lon % 360.0
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _stats_kernel(flat):
+        # Все три редукции в одном параллельном цикле: один проход
+        # по памяти вместо трех
+        mn = np.inf
+        mx = -np.inf
+        total = 0.0
+        for i in prange(flat.size):
+            v = flat[i]
+            mn = min(mn, v)
+            mx = max(mx, v)
+            total += v
+        return mn, mx, total
+
+
+def _raster_stats(raster, block_rows=1024):
+    """Минимум, максимум и среднее одним проходом по растру
+
+    Высоты получены из int16 умножением на скаляр — NaN в них не бывает,
+    и nan-варианты редукций (с поэлементной проверкой isnan) не нужны.
+    Вместо трех полных проходов по сотням мегабайт: с numba — одно
+    параллельное ядро, без него — блочный обход, где все три редукции
+    считаются по блоку, пока он горячий в кеше.
+    """
+    if NUMBA_AVAILABLE:
+        flat = np.ascontiguousarray(raster).reshape(-1)
+        mn, mx, total = _stats_kernel(flat)
+        return float(mn), float(mx), float(total) / flat.size
+
+    mn = np.inf
+    mx = -np.inf
+    total = 0.0
+    for row in range(0, raster.shape[0], block_rows):
+        block = raster[row : row + block_rows]
+        mn = min(mn, float(block.min()))
+        mx = max(mx, float(block.max()))
+        total += float(block.sum(dtype=np.float64))
+    return mn, mx, total / raster.size
+
+
+def _download_range(session, url, fd, start, end):
+    """Скачивает диапазон байтов [start, end] и пишет его по смещению
+
+    Каждый поток держит свое TCP-соединение, поэтому окно перегрузки
+    растет независимо и суммарная скорость не упирается в один поток.
+    Запись через os.pwrite не требует общей позиции файла и блокировок.
+    """
+    response = session.get(
+        url,
+        headers={"Range": f"bytes={start}-{end}"},
+        stream=True,
+        timeout=60,
+    )
+    response.raise_for_status()
+    if response.status_code != 206:
+        raise requests.exceptions.RequestException(
+            f"Сервер не поддерживает Range-запросы (код {response.status_code})"
+        )
+
+    offset = start
+    for chunk in response.iter_content(chunk_size=1024 * 1024):
+        if chunk:
+            os.pwrite(fd, chunk, offset)
+            offset += len(chunk)
 
 
-def download_img(url=None, filename="ldem_45n_100m.img", save_path=None):
+def download_img(url=None, filename="ldem_45n_100m.img", save_path=None, num_streams=8):
     """
     Скачивает файл с полярной стереографической проекцией
 
+    Если сервер поддерживает Range-запросы, файл качается num_streams
+    параллельными потоками по равным диапазонам байтов; иначе — обычная
+    последовательная загрузка.
+
     Parameters:
     -----------
     url : str, optional
@@ -19,6 +219,8 @@ def download_img(url=None, filename="ldem_45n_100m.img", save_path=None):
         Имя файла для сохранения (по умолчанию: ldem_45n_100m.img)
     save_path : str, optional
         Путь для сохранения файла. Если None, файл сохраняется в текущей директории
+    num_streams : int, optional
+        Количество параллельных потоков загрузки (по умолчанию: 8)
 
     Returns:
     --------
@@ -44,24 +246,74 @@ def download_img(url=None, filename="ldem_45n_100m.img", save_path=None):
         print(f"Начинаю загрузку файла с URL: {url}")
         print(f"Файл будет сохранен как: {save_path}")
 
+        # Сессия переиспользует TCP-соединения между запросами
+        session = requests.Session()
+
+        # Узнаем размер и поддержку Range-запросов одним HEAD-запросом
+        head = session.head(url, timeout=60, allow_redirects=True)
+        head.raise_for_status()
+        total_size = int(head.headers.get("content-length", 0))
+        accept_ranges = head.headers.get("accept-ranges", "").lower() == "bytes"
+
+        if total_size > 0 and accept_ranges and num_streams > 1:
+            print(f"Размер файла: {total_size / (1024*1024):.2f} MB")
+            print(f"Параллельная загрузка в {num_streams} потоков...")
+
+            # Делим файл на равные диапазоны; каждый поток пишет свой
+            # участок по абсолютному смещению в заранее созданный файл
+            segment = total_size // num_streams
+            ranges = [
+                (
+                    k * segment,
+                    (k + 1) * segment - 1 if k < num_streams - 1 else total_size - 1,
+                )
+                for k in range(num_streams)
+            ]
+
+            try:
+                with open(save_path, "wb") as file:
+                    fd = file.fileno()
+                    os.ftruncate(fd, total_size)
+                    with concurrent.futures.ThreadPoolExecutor(
+                        max_workers=num_streams
+                    ) as pool:
+                        futures = [
+                            pool.submit(_download_range, session, url, fd, a, b)
+                            for a, b in ranges
+                        ]
+                        for future in concurrent.futures.as_completed(futures):
+                            future.result()  # пробрасываем ошибки потоков
+
+                print(f"Файл успешно скачан: {save_path}")
+                return save_path
+            except requests.exceptions.RequestException as e:
+                # Сервер ответил 200 вместо 206 или оборвал диапазон —
+                # откатываемся на обычную последовательную загрузку
+                print(f"Параллельная загрузка не удалась ({e}), качаю одним потоком")
+
         # Отправляем GET запрос с потоковой передачей данных
-        response = requests.get(url, stream=True, timeout=60)
+        response = session.get(url, stream=True, timeout=60)
         response.raise_for_status()  # Проверяем на ошибки HTTP
 
         # Получаем размер файла
         file_size = int(response.headers.get("content-length", 0))
         print(f"Размер файла: {file_size / (1024*1024):.2f} MB")
 
-        # Скачиваем файл
-        with open(save_path, "wb") as file:
+        # Скачиваем файл: блоки по 1 МБ вместо 8 КБ — на два порядка
+        # меньше итераций цикла и вызовов записи; прогресс печатаем не
+        # чаще ~100 раз за файл, а не на каждый блок
+        report_step = max(file_size // 100, 1 << 20)
+        with open(save_path, "wb", buffering=1 << 20) as file:
             downloaded = 0
-            for chunk in response.iter_content(chunk_size=8192):
+            last_report = 0
+            for chunk in response.iter_content(chunk_size=1 << 20):
                 if chunk:
                     file.write(chunk)
                     downloaded += len(chunk)
 
                     # Выводим прогресс
-                    if file_size > 0:
+                    if file_size > 0 and downloaded - last_report >= report_step:
+                        last_report = downloaded
                         percent = (downloaded / file_size) * 100
                         print(
                             f"Прогресс: {percent:.1f}% ({downloaded/(1024*1024):.1f}/{file_size/(1024*1024):.1f} MB)",
@@ -98,95 +350,36 @@ def parse_polar_pds_label(label_file):
     params = {}
 
     try:
-        with open(label_file, "r", encoding="utf-8") as f:
-            content = f.read()
+        # PDS-метки — ASCII; читаем байты и декодируем без накладных
+        # расходов utf-8 на случай больших приложенных каталогов
+        with open(label_file, "rb") as f:
+            content = f.read().decode("ascii", errors="ignore")
 
         # Определяем тип проекции
         if "POLAR STEREOGRAPHIC" not in content.upper():
             print("⚠ Внимание: Файл не использует полярную стереографическую проекцию!")
             print("  Используется другая проекция")
 
-        # Извлекаем ключевые параметры с помощью регулярных выражений
-        patterns = {
-            # Основные параметры изображения
-            "lines": r"LINES\s*=\s*(\d+)",
-            "line_samples": r"LINE_SAMPLES\s*=\s*(\d+)",
-            "scaling_factor": r"SCALING_FACTOR\s*=\s*([\d\.\-]+)",
-            "offset": r"OFFSET\s*=\s*([\d\.\-]+)",
-            "sample_bits": r"SAMPLE_BITS\s*=\s*(\d+)",
-            # Параметры файла
-            "file_records": r"FILE_RECORDS\s*=\s*(\d+)",
-            "record_bytes": r"RECORD_BYTES\s*=\s*(\d+)",
-            # Параметры проекции (особенно важные для полярной)
-            "map_projection_type": r"MAP_PROJECTION_TYPE\s*=\s*\"([^\"]+)\"",
-            "map_scale": r"MAP_SCALE\s*=\s*([\d\.]+)\s*<m/pix>",
-            "center_latitude": r"CENTER_LATITUDE\s*=\s*([\d\.\-]+)\s*<deg>",
-            "center_longitude": r"CENTER_LONGITUDE\s*=\s*([\d\.\-]+)\s*<deg>",
-            "minimum_latitude": r"MINIMUM_LATITUDE\s*=\s*([\d\.\-]+)\s*<deg>",
-            "maximum_latitude": r"MAXIMUM_LATITUDE\s*=\s*([\d\.\-]+)\s*<deg>",
-            # Смещения проекции (ключевые для преобразования координат)
-            "sample_projection_offset": r"SAMPLE_PROJECTION_OFFSET\s*=\s*([\d\.\-]+)\s*<pix>",
-            "line_projection_offset": r"LINE_PROJECTION_OFFSET\s*=\s*([\d\.\-]+)\s*<pix>",
-            # Радиусы осей
-            "a_axis_radius": r"A_AXIS_RADIUS\s*=\s*([\d\.]+)\s*<km>",
-            "b_axis_radius": r"B_AXIS_RADIUS\s*=\s*([\d\.]+)\s*<km>",
-            "c_axis_radius": r"C_AXIS_RADIUS\s*=\s*([\d\.]+)\s*<km>",
-            # Дополнительные параметры
-            "derived_minimum": r"DERIVED_MINIMUM\s*=\s*([\d\.\-]+)",
-            "derived_maximum": r"DERIVED_MAXIMUM\s*=\s*([\d\.\-]+)",
-        }
-
-        for key, pattern in patterns.items():
-            match = re.search(pattern, content, re.IGNORECASE)
-            if match:
+        # Извлекаем все ключевые параметры одним линейным проходом
+        for match in _POLAR_LABEL_RE.finditer(content):
+            key = match.group(1).lower()
+            if key not in _POLAR_KEYS or key in params:
+                continue  # как и re.search, берем первое вхождение
+
+            value = match.group(2).strip()
+            if key in _POLAR_STRING_KEYS:
+                params[key] = value
+            else:
                 try:
-                    if key in [
-                        "scaling_factor",
-                        "offset",
-                        "map_scale",
-                        "center_latitude",
-                        "center_longitude",
-                        "minimum_latitude",
-                        "maximum_latitude",
-                        "sample_projection_offset",
-                        "line_projection_offset",
-                        "a_axis_radius",
-                        "b_axis_radius",
-                        "c_axis_radius",
-                    ]:
-                        params[key] = float(match.group(1))
-                    elif key in ["derived_minimum", "derived_maximum"]:
-                        params[key] = float(match.group(1))
-                    elif key == "map_projection_type":
-                        params[key] = match.group(1)
-                    else:
-                        params[key] = int(match.group(1))
+                    params[key] = (
+                        float(value) if key in _POLAR_FLOAT_KEYS else int(value)
+                    )
                 except ValueError:
                     # Если не получается преобразовать в число, сохраняем как строку
-                    params[key] = match.group(1)
-
-        # Извлекаем строковые параметры
-        string_patterns = {
-            "file_name": r"FILE_NAME\s*=\s*\"([^\"]+)\"",
-            "product_id": r"PRODUCT_ID\s*=\s*\"([^\"]+)\"",
-        }
-
-        for key, pattern in string_patterns.items():
-            match = re.search(pattern, content, re.IGNORECASE)
-            if match:
-                params[key] = match.group(1)
+                    params[key] = value
 
         # Заполняем значения по умолчанию для отсутствующих параметров
-        defaults = {
-            "sample_bits": 16,
-            "scaling_factor": 0.5,
-            "offset": 1737400.0,
-            "a_axis_radius": 1737.4,
-            "b_axis_radius": 1737.4,
-            "c_axis_radius": 1737.4,
-        }
-
-        for key, default_value in defaults.items():
+        for key, default_value in _POLAR_DEFAULTS.items():
             if key not in params:
                 params[key] = default_value
 
@@ -219,19 +412,21 @@ def convert_polar_ldem_to_meters(label_file, output_format="npz"):
     label_file : str
         Путь к файлу .lbl
     output_format : str
-        Формат вывода: "npz", "bin", "tif"
+        Формат вывода: "npz", "zst", "bin", "tif" ("zst" требует
+        zstandard и не читается поисковиком высот из main.py)
     """
 
     params = parse_polar_pds_label(label_file)
     if params is None:
         return
 
-    # Основные параметры
-    SCALING_FACTOR = params.get("scaling_factor", 0.5)
-    OFFSET = params.get("offset", 1737400.0)
+    # Основные параметры (числовые значения по умолчанию уже
+    # гарантированы парсером через _POLAR_DEFAULTS)
+    SCALING_FACTOR = params["scaling_factor"]
+    OFFSET = params["offset"]
     NROWS = params.get("lines")
     NCOLS = params.get("line_samples")
-    SAMPLE_BITS = params.get("sample_bits", 16)
+    SAMPLE_BITS = params["sample_bits"]
     input_file = params.get("file_name")
 
     if input_file is None:
@@ -243,6 +438,8 @@ def convert_polar_ldem_to_meters(label_file, output_format="npz"):
     base_name = os.path.splitext(label_file)[0]
     if output_format == "npz":
         output_file = base_name + "_meters.npz"
+    elif output_format == "zst":
+        output_file = base_name + "_meters.zst"
     elif output_format == "bin":
         output_file = base_name + "_meters.bin"
     elif output_format == "tif":
@@ -279,53 +476,74 @@ def convert_polar_ldem_to_meters(label_file, output_format="npz"):
         dtype = "<i2"  # по умолчанию
         print(f"⚠ Неизвестный SAMPLE_BITS={SAMPLE_BITS}, используем int16")
 
-    # Читаем бинарные данные
+    # Читаем бинарные данные одним буферизованным read() и оборачиваем
+    # в массив через np.frombuffer без копирования: np.fromfile заметно
+    # медленнее буферизованного чтения. Читаем ровно нужное количество
+    # байтов — лишний хвост файла не попадает в память
     print("📥 Чтение данных...")
+    expected_size = NCOLS * NROWS
+    itemsize = np.dtype(dtype).itemsize
     try:
         with open(input_file, "rb") as f:
-            data = np.fromfile(f, dtype=dtype)
+            raw = f.read(expected_size * itemsize)
     except Exception as e:
         print(f"✗ Ошибка чтения файла: {e}")
-        print("ℹ Пробую другой порядок байтов...")
-        try:
-            # Пробуем big-endian
-            with open(input_file, "rb") as f:
-                if SAMPLE_BITS == 16:
-                    data = np.fromfile(f, dtype=">i2")
-                else:
-                    data = np.fromfile(f, dtype=">i4")
-        except Exception as e2:
-            print(f"✗ Ошибка чтения с big-endian: {e2}")
-            return
+        return
 
-    # Проверяем размер данных
-    expected_size = NCOLS * NROWS
-    if len(data) != expected_size:
+    data = np.frombuffer(raw, dtype=dtype, count=len(raw) // itemsize)
+
+    # Проверяем размер данных: короткий файл вернет меньше байтов
+    if data.size < expected_size:
         print(
-            f"⚠ Предупреждение: ожидалось {expected_SIZE} значений, получено {len(data)}"
+            f"⚠ Предупреждение: ожидалось {expected_size} значений, получено {data.size}"
         )
-        # Пробуем обрезать или дополнить
-        if len(data) > expected_size:
-            print(f"ℹ Обрезаем данные до {expected_size} значений")
-            data = data[:expected_size]
-        else:
-            print(f"ℹ Данных недостаточно, возможно файл поврежден")
-            return
+        print(f"ℹ Данных недостаточно, возможно файл поврежден")
+        return
+
+    # Проверяем порядок байтов по данным на том же буфере: при неверном
+    # порядке высоты выходят далеко за реалистичный диапазон — тогда
+    # просто интерпретируем raw с обратным порядком, без второго чтения
+    sample = data[: min(expected_size, NCOLS * 64)]
+    sample_min = float(sample.min()) * SCALING_FACTOR
+    sample_max = float(sample.max()) * SCALING_FACTOR
+    if sample_min < -10000 or sample_max > 10000:
+        swapped = np.dtype(dtype).newbyteorder().str
+        print(
+            f"⚠ Высоты {sample_min:.0f}...{sample_max:.0f} м вне диапазона, "
+            f"пробуем порядок байтов {swapped}"
+        )
+        dtype = swapped
+        data = np.frombuffer(raw, dtype=dtype, count=expected_size)
 
     # Изменяем форму массива
     data = data.reshape(NROWS, NCOLS)
 
-    # Преобразование в метры (относительно сферы радиуса OFFSET)
+    # Преобразование в метры (относительно сферы радиуса OFFSET):
+    # приведение типа и умножение слиты в один проход — astype с
+    # последующим умножением гонял бы растр через память дважды
     print("🔄 Преобразование в метры...")
-    elevation_meters = data.astype(np.float32) * SCALING_FACTOR
-
-    # Также вычисляем абсолютную высоту (радиус)
-    radius_meters = elevation_meters + OFFSET
-
-    # Вычисляем статистику
-    min_height = np.nanmin(elevation_meters)
-    max_height = np.nanmax(elevation_meters)
-    mean_height = np.nanmean(elevation_meters)
+    sf = np.float32(SCALING_FACTOR)
+    if NUMEXPR_AVAILABLE:
+        elevation_meters = ne.evaluate("data * sf")
+        min_height, max_height, mean_height = _raster_stats(elevation_meters)
+    else:
+        # Блочный обход: масштабирование и все три редукции статистики
+        # идут по блоку строк, пока он горячий в кеше — и исходный, и
+        # выходной растры проходят через DRAM ровно один раз
+        elevation_meters = np.empty(data.shape, dtype=np.float32)
+        block_rows = max(8, (1 << 22) // (NCOLS * 4))  # блок ~4 МБ
+        mn = np.inf
+        mx = -np.inf
+        total = 0.0
+        for r0 in range(0, NROWS, block_rows):
+            out_block = elevation_meters[r0 : r0 + block_rows]
+            np.multiply(data[r0 : r0 + block_rows], sf, out=out_block, casting="unsafe")
+            mn = min(mn, float(out_block.min()))
+            mx = max(mx, float(out_block.max()))
+            total += float(out_block.sum(dtype=np.float64))
+        min_height = mn
+        max_height = mx
+        mean_height = total / elevation_meters.size
 
     print(f"📈 Статистика высот:")
     print(f"   Минимум: {min_height:.1f} м")
@@ -336,20 +554,54 @@ def convert_polar_ldem_to_meters(label_file, output_format="npz"):
     # Сохраняем результат в выбранном формате
     print(f"💾 Сохранение результата как {output_format}...")
 
-    if output_format == "npz":
-        # Сохраняем как сжатый numpy файл с метаданными
-        np.savez_compressed(
-            output_file,
-            elevation=elevation_meters,
-            radius=radius_meters,
-            metadata=params,
-        )
-        print(f"✓ Данные сохранены в {output_file}")
-        print(f"  Доступны массивы: elevation (высоты), radius (радиусы), metadata")
+    if output_format in ("npz", "zst"):
+        # Абсолютная высота (радиус) нужна только этим форматам —
+        # не тратим еще один полный массив в bin/tif ветках
+        if NUMEXPR_AVAILABLE:
+            off = np.float32(OFFSET)
+            radius_meters = ne.evaluate("elevation_meters + off")
+        else:
+            radius_meters = elevation_meters + OFFSET
+
+        # Метаданные — отдельный JSON-сайдкар: np.save словаря пиклит
+        # его через object-массив, привязывая файл к версии Python
+        meta_json = base_name + "_meta.json"
+        with open(meta_json, "w") as f:
+            json.dump(params, f, indent=2, ensure_ascii=False)
+
+        if output_format == "zst" and ZSTD_AVAILABLE:
+            # Потоковое сжатие zstd: сжатие перестает быть узким местом,
+            # запись снова упирается в диск
+            cctx = zstd.ZstdCompressor(level=3, threads=-1)
+            with open(output_file, "wb") as f:
+                with cctx.stream_writer(f) as writer:
+                    np.save(writer, elevation_meters)
+                    np.save(writer, radius_meters)
+            print(f"✓ Данные сохранены в {output_file}")
+            print(f"  Порядок записей: elevation, radius; метаданные в {meta_json}")
+        else:
+            if output_format == "zst":
+                print("✗ Для формата zst требуется zstandard")
+                print("ℹ Установите: pip install zstandard")
+                print("ℹ Сохраняю как сжатый .npz")
+                output_file = base_name + "_meters.npz"
+
+            # Сохраняем как сжатый numpy файл (только массивы)
+            np.savez_compressed(
+                output_file,
+                elevation=elevation_meters,
+                radius=radius_meters,
+            )
+            print(f"✓ Данные сохранены в {output_file}")
+            print(
+                f"  Доступны массивы: elevation (высоты), radius (радиусы); "
+                f"метаданные в {meta_json}"
+            )
 
     elif output_format == "bin":
         # Сохраняем как бинарный файл
-        elevation_meters.astype(np.float32).tofile(output_file)
+        # Массив уже float32 — astype здесь делал полную копию растра
+        elevation_meters.tofile(output_file)
         print(f"✓ Данные сохранены в бинарный файл {output_file}")
 
     elif output_format == "tif":
@@ -360,7 +612,7 @@ def convert_polar_ldem_to_meters(label_file, output_format="npz"):
 
             # Создаем transform для полярной проекции
             # Это упрощенное преобразование, для точного нужны параметры проекции
-            map_scale = params.get("map_scale", 100.0)
+            map_scale = params["map_scale"]
             center_x_px = params.get("sample_projection_offset", NCOLS / 2)
             center_y_px = params.get("line_projection_offset", NROWS / 2)
 
@@ -389,27 +641,29 @@ def convert_polar_ldem_to_meters(label_file, output_format="npz"):
             print("✗ Для сохранения как GeoTIFF требуется rasterio")
             print("ℹ Установите: pip install rasterio")
             print("ℹ Сохраняю как бинарный файл вместо GeoTIFF")
-            elevation_meters.astype(np.float32).tofile(
-                output_file.replace(".tif", ".bin")
-            )
+            elevation_meters.tofile(output_file.replace(".tif", ".bin"))
 
     else:
         # Сохраняем как простой бинарный файл
-        elevation_meters.astype(np.float32).tofile(output_file)
+        elevation_meters.tofile(output_file)
         print(f"✓ Данные сохранены в {output_file}")
 
-    # Сохраняем также текстовый файл с метаданными
+    # Сохраняем также текстовый файл с метаданными: отчет собирается
+    # в список строк и пишется одним вызовом write
     meta_file = base_name + "_metadata.txt"
+    report = [
+        "МЕТАДАННЫЕ ПОЛЯРНОЙ DEM ЛУНЫ\n",
+        "=" * 50 + "\n\n",
+    ]
+    report.extend(f"{key}: {value}\n" for key, value in params.items())
+    report.append(f"\nСтатистика высот:\n")
+    report.append(f"  Минимальная высота: {min_height:.1f} м\n")
+    report.append(f"  Максимальная высота: {max_height:.1f} м\n")
+    report.append(f"  Средняя высота: {mean_height:.1f} м\n")
+    report.append(f"  Относительно сферы радиусом: {OFFSET} м\n")
+
     with open(meta_file, "w") as f:
-        f.write("МЕТАДАННЫЕ ПОЛЯРНОЙ DEM ЛУНЫ\n")
-        f.write("=" * 50 + "\n\n")
-        for key, value in params.items():
-            f.write(f"{key}: {value}\n")
-        f.write(f"\nСтатистика высот:\n")
-        f.write(f"  Минимальная высота: {min_height:.1f} м\n")
-        f.write(f"  Максимальная высота: {max_height:.1f} м\n")
-        f.write(f"  Средняя высота: {mean_height:.1f} м\n")
-        f.write(f"  Относительно сферы радиусом: {OFFSET} м\n")
+        f.write("".join(report))
 
     print(f"📄 Метаданные сохранены в {meta_file}")
 
@@ -433,20 +687,26 @@ def create_coordinate_grid(params):
 
     NROWS = params.get("lines")
     NCOLS = params.get("line_samples")
-    map_scale = params.get("map_scale", 100.0)
+    map_scale = params["map_scale"]
     center_x_px = params.get("sample_projection_offset", NCOLS / 2)
     center_y_px = params.get("line_projection_offset", NROWS / 2)
 
-    # Создаем индексы пикселей
-    x_indices = np.arange(NCOLS)
-    y_indices = np.arange(NROWS)
+    # Создаем индексы пикселей: float32 хватает с запасом для координат
+    # в метрах при шаге ~100 м/пиксель и вдвое сокращает трафик памяти
+    # всей последующей арифметики
+    x_indices = np.arange(NCOLS, dtype=np.float32)
+    y_indices = np.arange(NROWS, dtype=np.float32)
 
-    # Преобразуем в метры от центра
-    grid_x = (x_indices - center_x_px) * map_scale
-    grid_y = (y_indices - center_y_px) * map_scale
+    # Преобразуем в метры от центра (скаляры приводим к float32,
+    # чтобы не раздувать результат до float64)
+    grid_x = (x_indices - np.float32(center_x_px)) * np.float32(map_scale)
+    grid_y = (y_indices - np.float32(center_y_px)) * np.float32(map_scale)
 
-    # Создаем 2D сетку
-    grid_x_2d, grid_y_2d = np.meshgrid(grid_x, grid_y)
+    # Разреженная 2D сетка: массивы (1, NCOLS) и (NROWS, 1) вместо двух
+    # плотных NROWS × NCOLS — значения в строках/столбцах все равно
+    # повторяются, а арифметика ниже по течению разворачивает их
+    # бродкастом без копирования
+    grid_x_2d, grid_y_2d = np.meshgrid(grid_x, grid_y, sparse=True)
 
     return grid_x_2d, grid_y_2d
 
@@ -468,9 +728,24 @@ def convert_to_geographic(grid_x, grid_y, params):
         Географические координаты в градусах
     """
 
-    R = params.get("a_axis_radius", 1737.4) * 1000  # в метрах
-    center_lat = params.get("center_latitude", 90.0)  # северный полюс
-    center_lon = params.get("center_longitude", 0.0)
+    R = params["a_axis_radius"] * 1000  # в метрах
+    center_lat = params["center_latitude"]  # северный полюс
+    center_lon = params["center_longitude"]
+
+    # Для разреженной сетки из create_coordinate_grid при наличии numba
+    # вся цепочка формул считается одним слитым ядром
+    if (
+        NUMBA_AVAILABLE
+        and np.ndim(grid_x) == 2
+        and grid_x.shape[0] == 1
+        and grid_y.shape[1] == 1
+    ):
+        xs = np.ascontiguousarray(grid_x).reshape(-1)
+        ys = np.ascontiguousarray(grid_y).reshape(-1)
+        lat = np.empty((ys.size, xs.size), dtype=xs.dtype)
+        lon = np.empty((ys.size, xs.size), dtype=xs.dtype)
+        _to_geo_kernel(xs, ys, R, center_lon, lat, lon)
+        return lat, lon
 
     # Для полярной стереографической проекции (сфера)
     # Формулы обратного преобразования
@@ -490,8 +765,11 @@ def convert_to_geographic(grid_x, grid_y, params):
     # Долгота
     lon = np.degrees(theta) + center_lon
 
-    # Приводим долготу к диапазону 0-360°
-    lon = lon % 360
+    # Приводим долготу к диапазону 0-360°: lon уже лежит в пределах
+    # ±360° + center_lon, поэтому хватает пары сложений по маске —
+    # поэлементный fmod из libm в разы дороже
+    np.add(lon, 360.0, out=lon, where=lon < 0.0)
+    np.subtract(lon, 360.0, out=lon, where=lon >= 360.0)
 
     return lat, lon
 
@@ -523,7 +801,9 @@ if __name__ == "__main__":
             # Создание координатной сетки
             print("\n3. Создание координатной сетки...")
             grid_x, grid_y = create_coordinate_grid(params)
-            print(f"   Размер сетки: {grid_x.shape}")
+            print(
+                f"   Размер сетки: {np.broadcast_shapes(grid_x.shape, grid_y.shape)}"
+            )
             print(f"   Диапазон X: {grid_x.min():.0f} до {grid_x.max():.0f} м")
             print(f"   Диапазон Y: {grid_y.min():.0f} до {grid_y.max():.0f} м")
 
@@ -532,20 +812,21 @@ if __name__ == "__main__":
             # Выберем несколько точек для примера
             test_points = [(0, 0), (10000, 0), (0, 10000)]
 
+            # Параметры проекции не меняются между точками — связываем
+            # их с локальными именами один раз, а не лезем в словарь
+            # на каждой итерации
+            map_scale = params["map_scale"]
+            sample_offset = params.get("sample_projection_offset", 14400)
+            line_offset = params.get("line_projection_offset", 14400)
+            n_samples = params.get("line_samples")
+            n_lines = params.get("lines")
+
             for x, y in test_points:
                 # Находим ближайшие пиксели
-                px = int(
-                    x / params.get("map_scale", 100.0)
-                    + params.get("sample_projection_offset", 14400)
-                )
-                py = int(
-                    y / params.get("map_scale", 100.0)
-                    + params.get("line_projection_offset", 14400)
-                )
+                px = int(x / map_scale + sample_offset)
+                py = int(y / map_scale + line_offset)
 
-                if 0 <= px < params.get("line_samples") and 0 <= py < params.get(
-                    "lines"
-                ):
+                if 0 <= px < n_samples and 0 <= py < n_lines:
                     height = elevation_data[py, px]
                     print(f"   Точка ({x:.0f}, {y:.0f}) м: высота = {height:.1f} м")
 
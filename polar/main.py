@@ -1,9 +1,107 @@
+import json
 import numpy as np
 import os
 import warnings
 
 warnings.filterwarnings("ignore")
 
+# numexpr не обязателен: при наличии batch-проекция координат считается
+# его блочным SIMD-интерпретатором — выражение обрабатывается кусками
+# размера L1-кеша в несколько потоков без полноразмерных промежуточных
+# массивов
+try:
+    import numexpr as ne
+
+    NUMEXPR_AVAILABLE = True
+except ImportError:
+    NUMEXPR_AVAILABLE = False
+
+# scipy не обязателен: при наличии интерполяция делегируется
+# C-реализации map_coordinates, включая кубическую (order=3)
+try:
+    from scipy.ndimage import map_coordinates
+
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+# numba не обязателен: при наличии билинейная интерполяция считается
+# скомпилированным ядром вместо восьми numpy-вызовов на скалярах;
+# cache=True сохраняет скомпилированный код между запусками
+try:
+    from numba import njit, prange
+
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+
+    @njit(cache=True, fastmath=True, boundscheck=False)
+    def _bilinear(elev, px, py, nrows, ncols):
+        # Веса считаем до зажима индексов, чтобы на границе растра
+        # интерполяция вырождалась в значение крайнего пикселя
+        fx = int(px)
+        fy = int(py)
+        wx = px - fx
+        wy = py - fy
+        x1 = min(max(fx, 0), ncols - 1)
+        x2 = min(max(fx + 1, 0), ncols - 1)
+        y1 = min(max(fy, 0), nrows - 1)
+        y2 = min(max(fy + 1, 0), nrows - 1)
+        v11 = elev[y1, x1]
+        v12 = elev[y1, x2]
+        v21 = elev[y2, x1]
+        v22 = elev[y2, x2]
+        return (
+            (1.0 - wx) * (1.0 - wy) * v11
+            + wx * (1.0 - wy) * v12
+            + (1.0 - wx) * wy * v21
+            + wx * wy * v22
+        )
+
+    @njit(parallel=True, cache=True, fastmath=True, boundscheck=False)
+    def _bilinear_batch(elev, pxs, pys, out):
+        nrows, ncols = elev.shape
+        for i in prange(pxs.size):
+            out[i] = _bilinear(elev, pxs[i], pys[i], nrows, ncols)
+
+    @njit(parallel=True, cache=True, fastmath=True, boundscheck=False)
+    def _heights_kernel(
+        lats, lons, elev, R, inv_scale, cx, cy, center_lon, elev_scale, out
+    ):
+        # Полный конвейер «проекция + выборка» на точку в одном
+        # параллельном цикле без GIL: растр потоки читают совместно,
+        # каждая итерация пишет только свой элемент out
+        nrows, ncols = elev.shape
+        for i in prange(lats.size):
+            r = 2.0 * R * np.tan(np.pi / 4 - 0.5 * np.radians(lats[i]))
+            theta = np.radians(lons[i] - center_lon)
+            px = r * np.cos(theta) * inv_scale + cx
+            py = r * np.sin(theta) * inv_scale + cy
+            xi = int(np.floor(px + 0.5))
+            yi = int(np.floor(py + 0.5))
+            if 0 <= xi < ncols and 0 <= yi < nrows:
+                out[i] = elev[yi, xi] * elev_scale
+            else:
+                out[i] = np.nan
+
+
+def _as_coord_array(a):
+    """Приводит координаты к массиву, не расширяя float32 до float64
+
+    Для треков из миллионов точек float32 вдвое сокращает трафик памяти,
+    а SIMD-линия трансцендентных функций вдвое шире (8 против 4 значений
+    на AVX2); целые и float64 входы считаются в float64 как раньше.
+    Скаляры остаются 0-d массивами — скалярный путь latlon_to_pixel
+    возвращает по ним обычные float.
+    """
+    a = np.asarray(a)
+    if a.dtype == np.float32:
+        return a
+    return a.astype(np.float64, copy=False)
+
 
 class LunarDEMHeightFinder:
     """Класс для поиска высот по координатам из NPZ файла"""
@@ -25,24 +123,87 @@ class LunarDEMHeightFinder:
         try:
             print(f"📂 Загрузка данных из {self.npz_file}...")
 
-            # Загружаем данные
-            data = np.load(self.npz_file, allow_pickle=True)
+            # Высоты работают через memmap: ОС подгружает только те
+            # страницы растра, которые затронуты запросами, вместо
+            # распаковки всего массива в RAM. Распакованная копия .npy
+            # создается рядом с npz при первом запуске; если сайдкары
+            # уже есть, сам npz вообще не открывается
+            base = os.path.splitext(self.npz_file)[0]
+            elev_file = base + ".elev.npy"
+
+            if not os.path.exists(elev_file):
+                data = np.load(self.npz_file)
+                if "elevation" not in data:
+                    raise ValueError("Файл не содержит массива 'elevation'")
+                print(f"ℹ Распаковываю высоты в {elev_file} (один раз)...")
+                elev = data["elevation"]
+                # Высоты LDEM — это int16 × 0.5 м по построению: если
+                # значения без потерь укладываются обратно в int16 с
+                # шагом 0.5 м, сайдкар пишем как int16 — вдвое меньше
+                # байтов на пиксель, вдвое выше полезная пропускная
+                # способность памяти на сканах и выборках
+                doubled = np.multiply(elev, 2.0)
+                quantized = doubled.astype(np.int16)
+                if np.array_equal(doubled, quantized):
+                    np.save(elev_file, quantized)
+                else:
+                    np.save(elev_file, elev)
 
-            # Проверяем наличие необходимых массивов
-            if "elevation" in data:
-                self.elevation = data["elevation"]
-                print(
-                    f"✅ Загружены высоты: {self.elevation.shape[1]}x{self.elevation.shape[0]} пикселей"
-                )
-            else:
-                raise ValueError("Файл не содержит массива 'elevation'")
+            self.elevation = np.load(elev_file, mmap_mode="r")
+            # Метры восстанавливаются умножением после выборки
+            self._elev_scale = 0.5 if self.elevation.dtype == np.int16 else 1.0
+            # Статистика растра считается лениво и кешируется
+            self._stats = None
+            print(
+                f"✅ Загружены высоты: {self.elevation.shape[1]}x{self.elevation.shape[0]} пикселей"
+            )
 
-            if "metadata" in data:
-                self.metadata = data["metadata"].item()
-                print(f"✅ Загружены метаданные")
-            else:
-                self.metadata = {}
-                print("⚠ Метаданные не найдены")
+            # Метаданные — из JSON-сайдкара конвертера: чтение не тянет
+            # pickle (allow_pickle плюс распаковка 0-d object-массива)
+            # и не требует открывать npz вовсе
+            meta_candidates = [base + "_meta.json", base + ".json"]
+            if base.endswith("_meters"):
+                meta_candidates.insert(0, base[: -len("_meters")] + "_meta.json")
+
+            self.metadata = None
+            for meta_file in meta_candidates:
+                if os.path.exists(meta_file):
+                    with open(meta_file) as f:
+                        self.metadata = json.load(f)
+                    print(f"✅ Загружены метаданные из {meta_file}")
+                    break
+
+            if self.metadata is None:
+                # Старые npz со словарем, внедренным через object-массив
+                data = np.load(self.npz_file, allow_pickle=True)
+                if "metadata" in data:
+                    self.metadata = data["metadata"].item()
+                    print(f"✅ Загружены метаданные")
+                else:
+                    self.metadata = {}
+                    print("⚠ Метаданные не найдены")
+
+            # Связываем скаляры проекции с атрибутами один раз: запросы
+            # не платят за шесть словарных обращений на каждую точку
+            required_params = (
+                "map_scale",
+                "sample_projection_offset",
+                "line_projection_offset",
+                "center_latitude",
+                "center_longitude",
+                "a_axis_radius",
+            )
+            self._missing_params = [
+                p for p in required_params if p not in self.metadata
+            ]
+            if not self._missing_params:
+                self._R = float(self.metadata["a_axis_radius"]) * 1000  # в метрах
+                self._inv_scale = 1.0 / float(self.metadata["map_scale"])
+                self._cx = float(self.metadata["sample_projection_offset"])
+                self._cy = float(self.metadata["line_projection_offset"])
+                self._center_lon = float(self.metadata["center_longitude"])
+            self._min_lat = float(self.metadata.get("minimum_latitude", 45))
+            self._max_lat = float(self.metadata.get("maximum_latitude", 90))
 
             # Выводим основную информацию
             if self.metadata:
@@ -65,51 +226,71 @@ class LunarDEMHeightFinder:
     def latlon_to_pixel(self, lat, lon):
         """
         Преобразует географические координаты в пиксельные
+
+        Принимает как скаляры, так и массивы NumPy: для массива вся
+        тригонометрия считается векторно одним проходом C-циклов вместо
+        вызова метода на каждую точку.
         """
-        # Проверяем наличие необходимых параметров
-        required_params = [
-            "map_scale",
-            "sample_projection_offset",
-            "line_projection_offset",
-            "center_latitude",
-            "center_longitude",
-            "a_axis_radius",
-        ]
-
-        for param in required_params:
-            if param not in self.metadata:
-                print(f"❌ Отсутствует параметр: {param}")
-                return None, None
-
-        # Проверяем границы широты
-        min_lat = self.metadata.get("minimum_latitude", 45)
-        max_lat = self.metadata.get("maximum_latitude", 90)
-
-        if lat < min_lat or lat > max_lat:
-            print(f"❌ Широта {lat}° вне диапазона ({min_lat}° - {max_lat}°)")
+        # Наличие параметров проекции проверено один раз в load_data
+        if self._missing_params:
+            print(f"❌ Отсутствует параметр: {self._missing_params[0]}")
             return None, None
 
-        # Параметры проекции
-        R = self.metadata["a_axis_radius"] * 1000  # в метрах
-        map_scale = self.metadata["map_scale"]
-        center_x_px = self.metadata["sample_projection_offset"]
-        center_y_px = self.metadata["line_projection_offset"]
-        center_lon = self.metadata.get("center_longitude", 0)
-
-        # Преобразование в полярные стереографические координаты
-        chi = np.radians(90 - lat)  # угол от полюса
-        r = 2 * R * np.tan(chi / 2)  # расстояние от центра
+        scalar_input = np.ndim(lat) == 0
 
-        theta = np.radians(lon - center_lon)  # азимут
+        # Проверяем границы широты (для массивов точки вне покрытия
+        # отсеиваются маской выхода за растр в batch-методах)
+        if scalar_input and (lat < self._min_lat or lat > self._max_lat):
+            print(
+                f"❌ Широта {lat}° вне диапазона "
+                f"({self._min_lat}° - {self._max_lat}°)"
+            )
+            return None, None
 
-        # Координаты в метрах
+        lat = _as_coord_array(lat)
+        lon = _as_coord_array(lon)
+
+        if not scalar_input and NUMEXPR_AVAILABLE:
+            # Локальные имена подхватываются numexpr из фрейма; для
+            # float32-входов константы связываются как float32 — иначе
+            # скаляры-double повышают весь результат до float64
+            ctype = np.float32 if lat.dtype == np.float32 else np.float64
+            R = ctype(self._R)
+            inv_scale = ctype(self._inv_scale)
+            cx = ctype(self._cx)
+            cy = ctype(self._cy)
+            clon = ctype(self._center_lon)
+            d2r = ctype(np.pi / 180.0)
+            quarter_pi = ctype(np.pi / 4.0)
+            # Литералы в выражении numexpr типизирует как double,
+            # поэтому 2 и 0.5 тоже связываются как ctype
+            two = ctype(2.0)
+            half = ctype(0.5)
+            r = ne.evaluate("two * R * tan(quarter_pi - half * lat * d2r)")
+            theta = ne.evaluate("(lon - clon) * d2r")
+            px = ne.evaluate("r * cos(theta) * inv_scale + cx")
+            py = ne.evaluate("r * sin(theta) * inv_scale + cy")
+            return px, py
+
+        # Преобразование в полярные стереографические координаты:
+        # tan(chi/2) при chi = radians(90 - lat) — это tan(pi/4 - lat/2),
+        # без промежуточного массива 90 - lat
+        r = 2 * self._R * np.tan(np.pi / 4 - 0.5 * np.radians(lat))
+
+        theta = np.radians(lon - self._center_lon)  # азимут
+
+        # Координаты в метрах: cos и sin над одним и тем же theta идут
+        # подряд — на сборках numpy с libmvec обе трансцендентные
+        # выполняются SIMD-циклами по горячему массиву
         x = r * np.cos(theta)
         y = r * np.sin(theta)
 
         # Координаты в пикселях
-        px = x / map_scale + center_x_px
-        py = y / map_scale + center_y_px
+        px = x * self._inv_scale + self._cx
+        py = y * self._inv_scale + self._cy
 
+        if scalar_input:
+            return float(px), float(py)
         return px, py
 
     def get_height_at_latlon(self, lat, lon):
@@ -134,17 +315,70 @@ class LunarDEMHeightFinder:
             print(f"❌ Координаты вне границ данных")
             return None
 
-        # Ближайший пиксель (без интерполяции для скорости)
-        x = int(np.round(px))
-        y = int(np.round(py))
+        # Ближайший пиксель (без интерполяции для скорости): после
+        # проверки границ px и py неотрицательны, поэтому округление к
+        # ближайшему — это int(px + 0.5) без numpy-вызова и боксинга
+        # 0-d скаляра; min страхует верхнюю границу при px > ncols - 0.5
+        x = min(int(px + 0.5), ncols - 1)
+        y = min(int(py + 0.5), nrows - 1)
 
-        height = self.elevation[y, x]
+        height = float(self.elevation[y, x]) * self._elev_scale
 
         return height
 
-    def get_height_interpolated(self, lat, lon):
+    def get_heights_at_latlon(self, lats, lons):
         """
-        Получает высоту с билинейной интерполяцией
+        Высоты сразу для массива координат (ближайший пиксель)
+
+        Проекция и выборка из растра выполняются векторно по всему
+        массиву; точки вне покрытия получают NaN вместо None.
+        """
+        lats = np.atleast_1d(_as_coord_array(lats))
+        lons = np.atleast_1d(_as_coord_array(lons))
+
+        if NUMBA_AVAILABLE and not self._missing_params:
+            heights = np.empty(lats.size, dtype=np.float64)
+            _heights_kernel(
+                lats,
+                lons,
+                self.elevation,
+                self._R,
+                self._inv_scale,
+                self._cx,
+                self._cy,
+                self._center_lon,
+                self._elev_scale,
+                heights,
+            )
+            return heights
+
+        px, py = self.latlon_to_pixel(lats, lons)
+        if px is None or py is None:
+            return np.full(lats.shape, np.nan)
+
+        nrows, ncols = self.elevation.shape
+        xi = np.round(px).astype(np.intp)
+        yi = np.round(py).astype(np.intp)
+
+        # Индексы зажимаются в допустимый диапазон, выборка идет одним
+        # fancy-индексом по всему массиву, а точки вне покрытия
+        # затираются NaN по маске — без компактирующих копий xi[mask]
+        # и поэлементной записи по маске
+        mask = (xi >= 0) & (xi < ncols) & (yi >= 0) & (yi < nrows)
+        np.clip(xi, 0, ncols - 1, out=xi)
+        np.clip(yi, 0, nrows - 1, out=yi)
+        heights = np.where(
+            mask, self.elevation[yi, xi] * self._elev_scale, np.nan
+        )
+
+        return heights
+
+    def get_height_interpolated(self, lat, lon, order=1):
+        """
+        Получает высоту с интерполяцией
+
+        order=1 — билинейная; при установленном scipy доступен и
+        кубический сплайн (order=3) через map_coordinates
         """
         px, py = self.latlon_to_pixel(lat, lon)
 
@@ -156,17 +390,50 @@ class LunarDEMHeightFinder:
         if px < 0 or px >= ncols or py < 0 or py >= nrows:
             return None
 
-        # Билинейная интерполяция
-        x1 = int(np.floor(px))
-        x2 = int(np.ceil(px))
-        y1 = int(np.floor(py))
-        y2 = int(np.ceil(py))
+        if order != 1:
+            if SCIPY_AVAILABLE:
+                value = map_coordinates(
+                    self.elevation,
+                    [[py], [px]],
+                    output=np.float64,
+                    order=order,
+                    mode="nearest",
+                )[0]
+                return float(value) * self._elev_scale
+            print("⚠ Для order > 1 требуется scipy, использую билинейную")
+
+        if NUMBA_AVAILABLE:
+            return (
+                float(_bilinear(self.elevation, px, py, nrows, ncols))
+                * self._elev_scale
+            )
 
-        # Проверяем границы
-        x1 = max(0, min(x1, ncols - 1))
-        x2 = max(0, min(x2, ncols - 1))
-        y1 = max(0, min(y1, nrows - 1))
-        y2 = max(0, min(y2, nrows - 1))
+        if SCIPY_AVAILABLE:
+            # Билинейная через C-цикл map_coordinates; prefilter при
+            # order=1 не нужен
+            value = map_coordinates(
+                self.elevation,
+                [[py], [px]],
+                output=np.float64,
+                order=1,
+                mode="nearest",
+                prefilter=False,
+            )[0]
+            return float(value) * self._elev_scale
+
+        # Билинейная интерполяция: px и py неотрицательны после
+        # проверки границ, поэтому int() усекает как floor, а верхний
+        # сосед — это просто floor + 1; np.floor/np.ceil на скалярах
+        # стоили по numpy-вызову каждый
+        x1 = int(px)
+        y1 = int(py)
+
+        # Веса — до зажима верхнего соседа к границе
+        wx = px - x1
+        wy = py - y1
+
+        x2 = min(x1 + 1, ncols - 1)
+        y2 = min(y1 + 1, nrows - 1)
 
         # Значения в соседних пикселях
         v11 = self.elevation[y1, x1]
@@ -174,10 +441,6 @@ class LunarDEMHeightFinder:
         v21 = self.elevation[y2, x1]
         v22 = self.elevation[y2, x2]
 
-        # Веса интерполяции
-        wx = px - x1
-        wy = py - y1
-
         # Интерполяция
         height = (
             (1 - wx) * (1 - wy) * v11
@@ -186,7 +449,119 @@ class LunarDEMHeightFinder:
             + wx * wy * v22
         )
 
-        return height
+        return height * self._elev_scale
+
+    def get_heights_interpolated(self, lats, lons):
+        """
+        Высоты с билинейной интерполяцией сразу для массива координат
+
+        Зажим индексов к границам растра выполняется одним np.clip на
+        массив вместо четырех ветвящихся max/min на каждую точку;
+        точки вне покрытия получают NaN.
+        """
+        lats = np.atleast_1d(_as_coord_array(lats))
+        lons = np.atleast_1d(_as_coord_array(lons))
+
+        px, py = self.latlon_to_pixel(lats, lons)
+        if px is None or py is None:
+            return np.full(lats.shape, np.nan)
+
+        nrows, ncols = self.elevation.shape
+        mask = (px >= 0) & (px < ncols) & (py >= 0) & (py < nrows)
+        heights = np.full(px.shape, np.nan)
+
+        if NUMBA_AVAILABLE:
+            # Ядру передаются только точки внутри растра
+            sel_px = px[mask]
+            sel_py = py[mask]
+            out = np.empty(sel_px.size)
+            _bilinear_batch(self.elevation, sel_px, sel_py, out)
+            heights[mask] = out * self._elev_scale
+            return heights
+
+        x1 = np.floor(px).astype(np.int32)
+        x2 = x1 + 1
+        y1 = np.floor(py).astype(np.int32)
+        y2 = y1 + 1
+
+        # Веса — до зажима, чтобы на границе интерполяция вырождалась
+        # в значение крайнего пикселя
+        wx = px - x1
+        wy = py - y1
+
+        np.clip(x1, 0, ncols - 1, out=x1)
+        np.clip(x2, 0, ncols - 1, out=x2)
+        np.clip(y1, 0, nrows - 1, out=y1)
+        np.clip(y2, 0, nrows - 1, out=y2)
+
+        # Соседи выбираются np.take по линейным индексам из плоского
+        # вида растра с записью в заранее выделенные буферы: 2-D
+        # fancy-индексация создавала бы временный массив на каждого из
+        # четырех соседей и на каждое произведение весов
+        flat = np.ravel(self.elevation)
+        n = px.size
+        lin = np.empty(n, dtype=np.intp)
+        corner = np.empty(n, dtype=flat.dtype)
+        weight = np.empty(n, dtype=np.float64)
+        term = np.empty(n, dtype=np.float64)
+        values = np.zeros(n, dtype=np.float64)
+
+        omwx = np.subtract(1.0, wx)
+        omwy = np.subtract(1.0, wy)
+
+        for yy, xx, wxx, wyy in (
+            (y1, x1, omwx, omwy),
+            (y1, x2, wx, omwy),
+            (y2, x1, omwx, wy),
+            (y2, x2, wx, wy),
+        ):
+            np.multiply(yy, ncols, out=lin, casting="unsafe")
+            np.add(lin, xx, out=lin, casting="unsafe")
+            np.take(flat, lin, out=corner)
+            np.multiply(wxx, wyy, out=weight)
+            np.multiply(corner, weight, out=term)
+            values += term
+
+        heights[mask] = values[mask] * self._elev_scale
+        return heights
+
+    def height_stats(self):
+        """
+        Минимум, максимум, среднее и стандартное отклонение высот
+
+        Считается один раз блочным проходом по memmap-растру (RSS не
+        растет до размера данных) и кешируется: повторные запросы
+        статистики ничего не сканируют.
+        """
+        if self._stats is not None:
+            return self._stats
+
+        mn = np.inf
+        mx = -np.inf
+        total = 0.0
+        total_sq = 0.0
+        count = 0
+
+        block_rows = 1024
+        for r0 in range(0, self.elevation.shape[0], block_rows):
+            block = np.asarray(
+                self.elevation[r0 : r0 + block_rows], dtype=np.float64
+            )
+            if self._elev_scale != 1.0:
+                block *= self._elev_scale
+            block = block[np.isfinite(block)]
+            if block.size == 0:
+                continue
+            mn = min(mn, float(block.min()))
+            mx = max(mx, float(block.max()))
+            total += float(block.sum())
+            total_sq += float(np.square(block).sum())
+            count += block.size
+
+        mean = total / count if count else float("nan")
+        std = np.sqrt(max(total_sq / count - mean * mean, 0.0)) if count else float("nan")
+        self._stats = {"min": mn, "max": mx, "mean": mean, "std": std}
+        return self._stats
 
 
 def print_welcome():
@@ -299,16 +674,15 @@ def main():
                 continue
 
             if user_input.lower() == "s":
-                if (
-                    hasattr(height_finder, "elevation")
-                    and height_finder.elevation is not None
-                ):
-                    data = height_finder.elevation[~np.isnan(height_finder.elevation)]
-                    print(f"\n📊 Статистика высот:")
-                    print(f"   Минимум: {np.min(data):.1f} м")
-                    print(f"   Максимум: {np.max(data):.1f} м")
-                    print(f"   Среднее: {np.mean(data):.1f} м")
-                    print(f"   Стандартное отклонение: {np.std(data):.1f} м")
+                # load_data либо загрузил высоты, либо выбросил
+                # исключение еще в конструкторе — страховочные
+                # hasattr/None-проверки здесь были мертвым кодом
+                stats = height_finder.height_stats()
+                print(f"\n📊 Статистика высот:")
+                print(f"   Минимум: {stats['min']:.1f} м")
+                print(f"   Максимум: {stats['max']:.1f} м")
+                print(f"   Среднее: {stats['mean']:.1f} м")
+                print(f"   Стандартное отклонение: {stats['std']:.1f} м")
                 continue
 
             if user_input.lower() == "i":
@@ -417,6 +791,49 @@ def quick_mode(npz_file, lat, lon):
         print(f"❌ Ошибка: {e}")
 
 
+def batch_mode(npz_file, coord_file, output_file=None):
+    """
+    Пакетный режим: высоты для целого файла координат одним проходом
+
+    Накладные расходы на загрузку растра и вызовы амортизируются по
+    всем точкам: проекция и выборка выполняются векторно, без цикла
+    по строкам на уровне интерпретатора.
+
+    Parameters:
+    -----------
+    npz_file : str
+        Путь к NPZ файлу
+    coord_file : str
+        CSV файл со строками "широта,долгота"
+    output_file : str, optional
+        Файл результата; по умолчанию <coord_file>_heights.csv
+    """
+    try:
+        coords = np.loadtxt(coord_file, delimiter=",", ndmin=2)
+        print(f"📥 Прочитано {coords.shape[0]} точек из {coord_file}")
+
+        height_finder = LunarDEMHeightFinder(npz_file)
+        lons = np.mod(coords[:, 1], 360.0)
+        heights = height_finder.get_heights_at_latlon(coords[:, 0], lons)
+
+        if output_file is None:
+            output_file = os.path.splitext(coord_file)[0] + "_heights.csv"
+
+        np.savetxt(
+            output_file,
+            np.column_stack([coords, heights]),
+            delimiter=",",
+            fmt="%.6f",
+            header="lat,lon,height_m",
+            comments="",
+        )
+        n_ok = int(np.count_nonzero(~np.isnan(heights)))
+        print(f"✅ Высоты найдены для {n_ok} из {heights.size} точек")
+        print(f"💾 Результат сохранен в {output_file}")
+    except Exception as e:
+        print(f"❌ Ошибка: {e}")
+
+
 if __name__ == "__main__":
     import sys
 
@@ -427,6 +844,9 @@ if __name__ == "__main__":
         lat = float(sys.argv[2])
         lon = float(sys.argv[3])
         quick_mode(npz_file, lat, lon)
+    elif len(sys.argv) == 3:
+        # Пакетный режим: python script.py файл.npz координаты.csv
+        batch_mode(sys.argv[1], sys.argv[2])
     else:
         # Интерактивный режим
         main()